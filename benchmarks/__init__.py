@@ -0,0 +1 @@
+# Headless scaling benchmarks for the timetable generator
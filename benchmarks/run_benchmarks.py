@@ -0,0 +1,240 @@
+# Headless scaling benchmark of process_files, create_timetable and the Excel export on synthetic data
+#
+#   python -m benchmarks.run_benchmarks --cases tiny small --output results.json
+#   python -m benchmarks.run_benchmarks --baseline results.json   # exit code 1 on a slowdown
+#
+# The generator page is loaded as a module outside `streamlit run` (Streamlit's bare mode), so its widgets
+# return their defaults and nothing is rendered. Each case runs in a fresh process so module globals and
+# peak RSS are per case.
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import generate_dataset, exam_counts, write_dataset
+
+PAGE_PATH = os.path.join(REPO_ROOT, "pages", "1_Generate_Timetable.py")
+
+# name: (students, exams)
+CASES = {
+    "tiny": (200, 20),
+    "small": (1000, 50),
+    "medium": (5000, 120),
+    "large": (20000, 250),
+    "xlarge": (50000, 500),
+}
+# Timings compared against a baseline run
+TIMED_METRICS = ["parse_time", "prepare_time", "build_time", "first_solution_time", "excel_time"]
+
+
+def load_page():
+    """Import the generator page as a module without a Streamlit server."""
+    spec = importlib.util.spec_from_file_location("generate_timetable_page", PAGE_PATH)
+    page = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(page)
+    return page
+
+
+def scale_rooms(rooms, na_room, copies, capacity_factor):
+    """Copy every physical room `copies` times with capacities multiplied by capacity_factor."""
+    scaled = {}
+    for room, (uses, capacity) in rooms.items():
+        if room == na_room:
+            continue
+        for copy in range(copies):
+            name = room if copy == 0 else f"{room} #{copy + 1}"
+            scaled[name] = [uses, capacity * capacity_factor]
+    scaled[na_room] = rooms[na_room]
+    return scaled
+
+
+def room_scaling(dataset, rooms, na_room):
+    """(copies, capacity_factor) that keep the largest exam and the exam count within the page's rooms."""
+    counts = exam_counts(dataset)
+    factor = 1
+    for exam, (aea, seq) in counts.items():
+        usable = [uses_cap for room, uses_cap in rooms.items() if room != na_room
+                  and (dataset["exam_types"][exam] != "PC" or "Computer" in uses_cap[0])]
+        for tag, students in (("AEA", aea), ("SEQ", seq)):
+            capacity = sum(cap for uses, cap in usable if tag in uses)
+            factor = max(factor, math.ceil(1.25 * students / capacity))
+    # About half of the (period, room) pairs of the default rooms, leaving the solver room to move exams
+    copies = max(1, math.ceil(len(dataset["exams"]) / 120))
+    return copies, factor
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case):
+    """Run the whole pipeline on one synthetic case and return its metrics."""
+    metrics = dict(case)
+    t = time.perf_counter()
+    dataset = generate_dataset(case["students"], case["exams"], case["exams_per_student"], case["overlap"],
+                               case["aea_share"], case["pc_share"], case["seed"])
+    with tempfile.TemporaryDirectory() as directory:
+        student_path, module_path, dates_path = write_dataset(dataset, case["keep_dir"] or directory)
+        metrics["write_time"] = time.perf_counter() - t
+
+        page = load_page()
+        from timetabling.progress import SolveProgress
+        from timetabling.rooms import NA_ROOM
+        if case["scale_rooms"]:
+            copies, factor = room_scaling(dataset, page.rooms, NA_ROOM)
+            page.rooms = scale_rooms(page.rooms, NA_ROOM, copies, factor)
+            metrics["room_copies"], metrics["room_capacity_factor"] = copies, factor
+
+        # The page's fixed and core modules are real Mechanical Engineering exams, none of which are synthetic
+        page.Fixed_modules, page.Core_modules = {}, []
+        page.student_file, page.module_file, page.dates_file = student_path, module_path, dates_path
+        t = time.perf_counter()
+        dataset, error = page.process_files()
+        metrics["parse_time"] = time.perf_counter() - t
+        if dataset is None or error:
+            metrics["status"] = "invalid input"
+            metrics["peak_rss_mb"] = peak_rss_mb()
+            return metrics
+
+        # Time the model build and record its size through the page's own build_model
+        build_model = page.build_model
+        def timed_build_model(*args, **kwargs):
+            start = time.perf_counter()
+            model, handles = build_model(*args, **kwargs)
+            if not kwargs.get("explain"):
+                metrics["build_start"] = start
+                metrics["build_time"] = time.perf_counter() - start
+                proto = model.Proto()
+                metrics["variables"] = len(proto.variables)
+                metrics["constraints"] = len(proto.constraints)
+            return model, handles
+        page.build_model = timed_build_model
+
+        preset = {"max_time_in_seconds": case["time_limit"], "num_workers": case["workers"], "random_seed": case["seed"],
+                  "relative_gap_limit": 0.0, "log_search_progress": False}
+        progress = SolveProgress()
+        t = time.perf_counter()
+        result = page.create_timetable(dataset, case["max_exams_2days"], case["max_exams_5days"],
+                                       case["decomposed"], preset, progress=progress)
+        end = time.perf_counter()
+        metrics["prepare_time"] = metrics.pop("build_start", end) - t
+        metrics["preflight_errors"] = len(progress.preflight_errors)
+        _, solutions = progress.latest()
+        metrics["first_solution_time"] = solutions[0]["wall_time"] if solutions else None
+        metrics["solutions"] = len(solutions)
+        metrics["solve_time"] = end - t - metrics["prepare_time"] - metrics.get("build_time", 0)
+        if progress.diagnostics is not None:
+            metrics["families"] = progress.diagnostics["families"]
+        if result is None:
+            metrics["status"] = "preflight rejected" if progress.preflight_errors else (
+                "infeasible" if progress.conflicts is not None else "no solution")
+        else:
+            metrics["status"] = "solved"
+            metrics["penalty"] = result.penalty
+            metrics["session_mb"] = result.payload_bytes() / 2 ** 20
+            t = time.perf_counter()
+            result.excel()
+            metrics["excel_time"] = time.perf_counter() - t
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return metrics
+
+
+def compare(results, baseline, tolerance):
+    """Return messages for every timed metric that grew by more than tolerance over the baseline."""
+    previous = {r["name"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get(r["name"])
+        if old is None:
+            continue
+        for key in TIMED_METRICS + ["peak_rss_mb"]:
+            if r.get(key) is None or old.get(key) is None:
+                continue
+            # Ignore noise on sub-second timings
+            if r[key] > old[key] * (1 + tolerance) and r[key] - old[key] > 0.5:
+                regressions.append(f"{r['name']}: {key} {old[key]:.2f} -> {r[key]:.2f}")
+    return regressions
+
+
+def format_row(r):
+    def fmt(value, spec=".2f"):
+        return "-" if value is None else format(value, spec)
+    return (f"{r['name']:<10} {r['students']:>7} {r['exams']:>5} {r['status']:<18} {fmt(r.get('parse_time')):>8} "
+            f"{fmt(r.get('build_time')):>8} {fmt(r.get('variables'), 'd'):>9} {fmt(r.get('constraints'), 'd'):>9} "
+            f"{fmt(r.get('first_solution_time')):>8} {fmt(r.get('solve_time')):>8} {fmt(r.get('peak_rss_mb'), '.0f'):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the timetable pipeline on synthetic datasets")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=["tiny", "small", "medium"])
+    parser.add_argument("--students", type=int, help="Run a single custom case with this many students")
+    parser.add_argument("--exams", type=int, default=50, help="Exams in the custom case")
+    parser.add_argument("--exams-per-student", type=int, default=6)
+    parser.add_argument("--overlap", type=float, default=0.2, help="Chance each exam pick comes from the next programme")
+    parser.add_argument("--aea-share", type=float, default=0.1)
+    parser.add_argument("--pc-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-exams-2days", type=int, default=3)
+    parser.add_argument("--max-exams-5days", type=int, default=4)
+    parser.add_argument("--decomposed", action="store_true", help="Allocate rooms per period after the period assignment")
+    parser.add_argument("--no-room-scaling", action="store_true", help="Use the page's rooms as they are, large cases will be rejected")
+    parser.add_argument("--keep-files", help="Directory to keep the generated workbooks in")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for slowdowns")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = {"custom": (args.students, args.exams)} if args.students else {name: CASES[name] for name in args.cases}
+    results = []
+    print(f"{'case':<10} {'students':>7} {'exams':>5} {'status':<18} {'parse s':>8} {'build s':>8} "
+          f"{'vars':>9} {'cons':>9} {'first s':>8} {'solve s':>8} {'RSS MB':>8}")
+    for name, (num_students, num_exams) in sizes.items():
+        keep_dir = None
+        if args.keep_files:
+            keep_dir = os.path.join(args.keep_files, name)
+            os.makedirs(keep_dir, exist_ok=True)
+        case = {"name": name, "students": num_students, "exams": num_exams, "exams_per_student": args.exams_per_student,
+                "overlap": args.overlap, "aea_share": args.aea_share, "pc_share": args.pc_share, "seed": args.seed,
+                "time_limit": args.time_limit, "workers": args.workers, "max_exams_2days": args.max_exams_2days,
+                "max_exams_5days": args.max_exams_5days, "decomposed": args.decomposed,
+                "scale_rooms": not args.no_room_scaling, "keep_dir": keep_dir}
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            metrics = executor.submit(run_case, case).result()
+        results.append(metrics)
+        print(format_row(metrics), flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"Slower than baseline: {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# Synthetic student list, module list and useful dates workbooks in the layouts the generator page validates
+import math
+import random
+from datetime import datetime
+
+from openpyxl import Workbook
+
+STUDENT_HEADERS = ["CID", "Surname", "Forename", "Additional Exam Arrangements AEA", "Programme",
+                   "Year", "Route", "Email", "Status"]
+MODULE_HEADERS = ["Banner Code (New CR)", "Module Name", "Module Leader (lecturer 1)",
+                  "(UGO Internal) 2nd Exam Marker", "(UGO Internal) Exam Style"]
+# Share of AEA students in each arrangement, the rest get an arrangement without extra time
+AEA_ARRANGEMENTS = [("25% extra time", 0.4), ("50% extra time", 0.2), ("Rest breaks", 0.4)]
+
+
+def exam_name(i):
+    return f"SYN{i:05d} Synthetic Module {i}"
+
+
+def generate_dataset(num_students, num_exams, exams_per_student=6, overlap=0.2, aea_share=0.1, pc_share=0.1, seed=0):
+    """Draw a random cohort and return it as plain data.
+
+    Exams are split into programmes of about 10 and each student takes exams_per_student from their own
+    programme, except that each pick comes from the next programme with probability overlap, like an
+    elective shared between two courses. Higher overlap gives a denser exam-conflict graph. Returns {"exams", "exam_types", "students", "leaders"} where
+    students is a list of (cid, arrangement or None, [exams]) and leaders maps exam -> [leader, marker].
+    """
+    rng = random.Random(seed)
+    exams = [exam_name(i) for i in range(num_exams)]
+    exam_types = {exam: "PC" if rng.random() < pc_share else "Written" for exam in exams}
+    num_programmes = max(1, num_exams // 10)
+    programmes = [exams[p::num_programmes] for p in range(num_programmes)]
+
+    students = []
+    for i in range(num_students):
+        p = rng.randrange(num_programmes)
+        pool = programmes[p]
+        neighbours = programmes[(p + 1) % num_programmes]
+        taken = set()
+        target = min(exams_per_student, num_exams)
+        while len(taken) < target:
+            if len(taken) >= len(set(pool + neighbours)):
+                source = exams
+            elif rng.random() < overlap or len(taken) >= len(pool):
+                source = neighbours
+            else:
+                source = pool
+            taken.add(rng.choice(source))
+        arrangement = None
+        if rng.random() < aea_share:
+            arrangement = rng.choices([a for a, _ in AEA_ARRANGEMENTS], [w for _, w in AEA_ARRANGEMENTS])[0]
+        students.append((1000000 + i, arrangement, sorted(taken, key=exams.index)))
+
+    num_leaders = max(1, math.ceil(num_exams / 3))
+    leaders = {}
+    for exam in exams:
+        leader = f"Leader {rng.randrange(num_leaders)}"
+        marker = f"Leader {rng.randrange(num_leaders)}" if rng.random() < 0.5 else None
+        leaders[exam] = [leader, marker]
+    return {"exams": exams, "exam_types": exam_types, "students": students, "leaders": leaders}
+
+
+def exam_counts(dataset):
+    """{exam: [AEA students, non-AEA students]}, as counted by create_timetable."""
+    counts = {exam: [0, 0] for exam in dataset["exams"]}
+    for _, arrangement, taken in dataset["students"]:
+        for exam in taken:
+            counts[exam][0 if arrangement else 1] += 1
+    return counts
+
+
+def write_student_list(dataset, path):
+    """Student list: header row, a second header row, then one row per student with 'x' per exam taken."""
+    exams = dataset["exams"]
+    column = {exam: 9 + i for i, exam in enumerate(exams)}
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Students")
+    ws.append(STUDENT_HEADERS + exams)
+    ws.append([None] * len(STUDENT_HEADERS) + ["Summer"] * len(exams))
+    for cid, arrangement, taken in dataset["students"]:
+        row = [cid, f"Surname{cid}", f"Forename{cid}", arrangement, "MEng", 4, "Core", f"{cid}@example.ac.uk", "Active"]
+        row += [None] * len(exams)
+        for exam in taken:
+            row[column[exam]] = "x"
+        ws.append(row)
+    wb.save(path)
+
+
+def write_module_list(dataset, path):
+    """Module list: the modules sheet is the second one, with its column headers on the second row."""
+    wb = Workbook(write_only=True)
+    wb.create_sheet("Notes").append(["Synthetic module list"])
+    ws = wb.create_sheet("Modules")
+    ws.append(["Module list"])
+    ws.append(MODULE_HEADERS)
+    for exam in dataset["exams"]:
+        code, name = exam.split(" ", 1)
+        leader, marker = dataset["leaders"][exam]
+        ws.append([code, name, leader, marker, dataset["exam_types"][exam]])
+    wb.save(path)
+
+
+def write_useful_dates(path, year=2025):
+    """Useful dates: bank holidays from F5/G5 down to 'Term Dates', then each term name above its date range."""
+    wb = Workbook()
+    ws = wb.active
+    ws["F4"] = "Bank Holidays"
+    ws["F5"], ws["G5"] = "Early May Bank Holiday", datetime(year, 5, 5)
+    ws["F6"], ws["G6"] = "Spring Bank Holiday", datetime(year, 5, 26)
+    ws["F7"] = f"Term Dates {year - 1}-{year % 100}"
+    ws["F8"] = "Autumn Term"
+    ws["F9"] = f"Monday 30 September to Friday 13 December {year - 1}"
+    ws["F10"] = "Spring Term"
+    ws["F11"] = f"Monday 6 January to Friday 21 March {year}"
+    ws["F12"] = "Summer Term"
+    ws["F13"] = f"Tuesday 22 April to Friday 27 June {year}"
+    wb.save(path)
+
+
+def write_dataset(dataset, directory):
+    """Write the three input workbooks into directory and return their paths (students, modules, dates)."""
+    paths = (f"{directory}/student_list.xlsx", f"{directory}/module_list.xlsx", f"{directory}/useful_dates.xlsx")
+    write_student_list(dataset, paths[0])
+    write_module_list(dataset, paths[1])
+    write_useful_dates(paths[2])
+    return paths
@@ -1,8 +1,11 @@
 import os
+import multiprocessing
 import streamlit.web.cli as stcli
 import sys
 
 if __name__ == "__main__":
+    # Needed for the room allocation process pool in the frozen executable
+    multiprocessing.freeze_support()
     app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Home_Page.py")
 
     if not os.path.exists(app_path):
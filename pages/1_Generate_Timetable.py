@@ -1,20 +1,33 @@
 import streamlit as st
 import pandas as pd
 from ortools.sat.python import cp_model
-from rapidfuzz import process, fuzz
 from collections import defaultdict
-from openpyxl import load_workbook, Workbook
-from openpyxl.styles import PatternFill, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
-from datetime import datetime, timedelta
+from datetime import timedelta
 import re
 from dateutil.parser import parse
 import time
 import logging
 import threading
 import streamlit.components.v1 as components
-from io import BytesIO
-import pickle
+import os
+from timetabling.conflicts import build_conflict_graph, exam_cliques
+from timetabling.students import group_students, describe_students
+from timetabling.rooms import add_room_constraints, add_period_capacity_constraints, allocate_rooms
+from timetabling.presets import load_presets, apply_preset, DEFAULT_PRESET
+from timetabling.schedule_io import file_reading
+from timetabling.bulk_export import EXPORT_FORMATS
+from timetabling.result import TimetableResult
+from timetabling.progress import SolveProgress
+from timetabling.model_cache import ModelCache, model_cache_key
+from timetabling.infeasibility import ConstraintGuards, explain_infeasibility, EXPLAIN_TIME_LIMIT
+from timetabling.preflight import core_fixed_clashes, preflight_checks
+from timetabling.diagnostics import BuildStats, solve_diagnostics, diagnostics_json
+from timetabling.profiling import PhaseProfiler, profiling_requested
+from timetabling.student_list import StudentList, parse_student_list
+from timetabling.dataset_cache import DatasetCache, dataset_key, file_bytes
+from timetabling.ingest import read_student_list, read_module_list, read_useful_dates
+from timetabling.matching import match_modules
+from timetabling.match_store import MatchStore
 
 
 # Set up logging
@@ -69,6 +82,9 @@ rooms = {
     'NON ME N/A':[["SEQ","AEA"],1000], #For business and non Mech Eng modules
 }
 
+# Maximum rounds of re-solving the period assignment when rooms can't be packed (decomposed mode)
+max_room_rounds = 5
+
 # No exam dates (weekends and last Friday morning)
 no_exam_dates = [
     [5,0], [5,1], [6,0], [6,1],  # First weekend
@@ -89,8 +105,11 @@ def ordinal(n):
     else:
         return f"{n}{['th','st','nd','rd','th','th','th','th','th','th'][n % 10]}"
 
-def validate_student_list(df):
-    """Validate the student list Excel file format and content."""
+def validate_student_list(df, student_list=None):
+    """Validate the student list Excel file format and content.
+
+    student_list is the parsed list (see parse_student_list); its cell errors are reported once the layout is valid.
+    """
     errors = []
     
     if len(df) < 3:
@@ -106,17 +125,9 @@ def validate_student_list(df):
         errors.append("No exam columns found starting from column J")
         return errors
     
-    student_rows = df.iloc[2:, :]
-    for idx, row in student_rows.iterrows():
-        cid = row[0]
-        if pd.isna(cid):
-            errors.append(f"Missing CID in row {idx + 3}")
-            continue
-        for col_idx, exam_name in enumerate(exam_columns, start=9):
-            value = str(row[col_idx]).strip().lower()
-            if value not in ['x', 'a', 'b', 'nan']:
-                errors.append(f"Invalid exam indicator '{value}' for student {cid} in exam {exam_name}")
-
+    if student_list is None:
+        student_list = parse_student_list(df)
+    errors.extend(student_list.errors)
     return errors
 
 def validate_module_list(df):
@@ -134,87 +145,69 @@ def validate_module_list(df):
 
     return errors
 
-def validate_useful_dates(wb):
-    """Validate the useful dates Excel file format and content."""
+def validate_useful_dates(dates):
+    """Validate the useful dates Excel file format and content (dates as returned by read_useful_dates)."""
     errors = []
-    if not wb:
+    if not dates:
         errors.append("Could not open useful dates file")
         return errors
-    ws = wb.active
-    found_bank_holidays = False
-    row = 5
-    while True:
-        name = ws[f"F{row}"].value
-        if name is None or "Term Dates" in str(name):
-            break
-        if "Bank Holiday" in str(name):
-            found_bank_holidays = True
-            break
-        row += 1
-    if not found_bank_holidays:
-        errors.append("Could not find bank holidays section in useful dates file")
-    found_summer_term = False
-    row = 5
-    while row < ws.max_row:
-        cell_value = ws[f"F{row}"].value
-        if cell_value and "Summer Term" in str(cell_value):
-            found_summer_term = True
-            break
-        row += 1
-    if not found_summer_term:
-        errors.append("Could not find Summer Term section in useful dates file")
+    # The bank holiday and Summer Term sections are checked while the sheet is read
+    errors.extend(dates["errors"])
     return errors
 
-def process_files():
+def process_files(profiler=None, dataset_cache=None, match_store=None):
+    # Read, validate and parse the uploaded files into a dataset for create_timetable (see load_dataset).
+    # Returns (dataset, error); parsed datasets are reused from dataset_cache while the files and the
+    # module match overrides in match_store are unchanged
     error = False
+    profiler = profiler or PhaseProfiler()
     #Process uploaded files and return processed data.
     if not all([student_file, module_file, dates_file]):
         st.error("Please upload all required files")
-        return None, None, None
+        return None, True
     try:
-        student_df = pd.read_excel(student_file, header=None)
-        module_df = pd.read_excel(module_file, sheet_name=1, header=1)
-        dates_wb = load_workbook(dates_file)
-        student_errors = validate_student_list(student_df)
-        
-        if student_errors:
-            st.error("Student list errors:\n" + "\n".join(student_errors))
-            return None, None, None
-        module_errors = validate_module_list(module_df)
-        if module_errors:
-            st.error("Module list errors:\n" + "\n".join(module_errors))
-            return None, None, None
-        dates_errors = validate_useful_dates(dates_wb)
-        if dates_errors:
-            st.error("Useful dates errors:\n" + "\n".join(dates_errors))
-            return None, None, None
+        with profiler.phase("Excel read"):
+            contents = [file_bytes(f) for f in (student_file, module_file, dates_file)]
+        key = dataset_key(*contents, match_store.fingerprint().encode("utf-8") if match_store is not None else b"")
+        dataset = dataset_cache.get(key) if dataset_cache is not None else None
+        if dataset is not None:
+            logger.info("Reusing parsed dataset")
+        else:
+            with profiler.phase("Excel read"):
+                # Read-only and values only, keeping just the sheets and columns used below
+                student_df = read_student_list(contents[0])
+                module_df = read_module_list(contents[1])
+                dates = read_useful_dates(contents[2])
+            with profiler.phase("Student-exam parsing"):
+                # One vectorised pass shared by validation, the clash check and create_timetable
+                student_list = parse_student_list(student_df)
+            with profiler.phase("Validation"):
+                student_errors = validate_student_list(student_df, student_list)
+                module_errors = validate_module_list(module_df)
+                dates_errors = validate_useful_dates(dates)
+            if student_errors:
+                st.error("Student list errors:\n" + "\n".join(student_errors))
+                return None, True
+            if module_errors:
+                st.error("Module list errors:\n" + "\n".join(module_errors))
+                return None, True
+            if dates_errors:
+                st.error("Useful dates errors:\n" + "\n".join(dates_errors))
+                return None, True
+            dataset = load_dataset(student_list, module_df, dates, profiler, match_store)
+            if dataset is None:
+                return None, True
+            if dataset_cache is not None:
+                dataset_cache.put(key, dataset)
         
-        #Read exams
-        exams = student_df.iloc[0, 9:].dropna().tolist()
-        student_rows = student_df.iloc[2:, :]
-    
-        #Form dictionary of each students exams
-        student_exams = {}
-        for _, row in student_rows.iterrows():
-            cid = row[0]
-            exams_taken = []
-            for col_idx, exam_name in enumerate(exams, start=9):
-                if str(row[col_idx]).strip().lower() in ['x', 'a', 'b']:
-                    exams_taken.append(exam_name)
-            student_exams[cid] = exams_taken
-        for student in student_exams:
-            for exam in student_exams[student]:
-                if exam in Core_modules:
-                    for other_exam in Fixed_modules:
-                        if other_exam in student_exams[student]:
-                            if exam != other_exam and Fixed_modules[exam][0] == Fixed_modules[other_exam][0]:
-                                st.error(f"Core module {exam} conflicts with fixed module {other_exam} on the same day for student {student} so model will be infeasible")
-                                error = True
-        return student_df, module_df, dates_wb, error
+        for student, exam, other_exam in core_fixed_clashes(dataset["students"].student_exams(), Core_modules, Fixed_modules):
+            st.error(f"Core module {exam} conflicts with fixed module {other_exam} on the same day for student {student} so model will be infeasible")
+            error = True
+        return dataset, error
     
     except Exception as e:
         st.error(f"Error processing files: {str(e)}")
-        return None, None, None
+        return None, True
 
 def to_dict(obj):
     # Recursively convert defaultdicts to dicts
@@ -227,291 +220,188 @@ def to_dict(obj):
     else:
         return obj
 
-def create_timetable(students_df, leaders_df, wb,max_exams_2days, max_exams_5days):
-    # Extract exam names from row 0, starting from column J (index 9)
-    exams = students_df.iloc[0, 9:].dropna().tolist()
-    # Get the range of rows containing student data (from row 3 onward)
-    student_rows = students_df.iloc[2:, :]  # row index 3 and onward
-
-    # Process bank holidays and create no_exam_dates
-    ws = wb.active
-    bank_holidays = []
-    row = 5
-    
-    while True:
-        name = ws[f"F{row}"].value
-        date_cell = ws[f"G{row}"].value
-        if name is None or "Term Dates" in str(name):
-            break
-        if isinstance(date_cell, datetime):
-            bank_holidays.append((str(name).strip(), date_cell.date()))
-        row += 1
-
-    # Find Summer Term start date
-    summer_start = None
-    while row < ws.max_row:
-        cell_value = ws[f"F{row}"].value
-        if cell_value and "Summer Term" in str(cell_value):
-            term_range = ws[f"F{row + 1}"].value
-            if term_range:
-                try:
-                    start_part = term_range.split("to")[0].strip()
-                    start_str = re.sub(r"^\w+\s+", "", start_part)
-                    year_match = re.search(r"\b\d{4}\b", term_range)
-                    if year_match:
-                        start_str += f" {year_match.group(0)}"
-                    else:
-                        st.error("Year not found in date range.")
-                        return None
-                    summer_start = parse(start_str, dayfirst=True).date()
-                except Exception as e:
-                    st.error(f"Could not parse Summer Term start: {term_range}")
-                    return None
-            break
-        row += 1
-    if not summer_start:
-        st.error("Summer Term start date not found")
-        return None
-    
-    # Find first Monday
-    first_monday = summer_start
-    while first_monday.weekday() != 0:
-        first_monday += timedelta(days=1)
-    for name, bh_date in bank_holidays:
-        delta = (bh_date - first_monday).days
-        if 0 <= delta <= 20:
-            no_exam_dates.append([delta, 0])
-            no_exam_dates.append([delta, 1])
-
-    #Form dictionary of student_exams
-    student_exams = {}
-    for _, row in student_rows.iterrows():
-        cid = row[0]  # Column A = student CID
-        exams_taken = []
-        for col_idx, exam_name in enumerate(exams, start=9):
-            if str(row[col_idx]).strip().lower() == 'x' or str(row[col_idx]).strip().lower() == 'a'  or str(row[col_idx]).strip().lower() == 'b' :  # Check for 'x' or 'a' or 'b' to indicate they take this course (case-insensitive)
-                exams_taken.append(exam_name)
-        student_exams[cid] = exams_taken
-    student_rows = students_df.iloc[2:, :]  # row index 3 and onward
-    
-    #Get the list of days from useful dates
-    days = []
-    for i in range(21):
-        date = first_monday + timedelta(days=i)
-        day_str = date.strftime("%A ") + ordinal(date.day) + date.strftime(" %B")
-        days.append(day_str)
-    valid_aea_mask = (
-        student_rows.iloc[:, 3].notna() &
-        (student_rows.iloc[:, 3].astype(str).str.strip() != "#N/A")
-    )
+def build_model(exams, days, slots, student_exams, student_classes, exam_sets, cliques, leader_courses, exam_counts, exam_types,
+                max_exams_2days, max_exams_5days, decomposed, pinned, explain=False):
+    """Build every constraint and penalty term of the timetable model, without the objective.
 
-    AEA = student_rows.loc[valid_aea_mask, student_rows.columns[0]].tolist()
-    
-    standardized_names = exams
-
-    leader_courses = defaultdict(list)
-    exam_types = dict()
-
-    for _, row in leaders_df.iterrows():
-        leaders = []
-        if pd.notna(row['Module Leader (lecturer 1)']):
-            leaders.append(row['Module Leader (lecturer 1)'])
-        if pd.notna(row['(UGO Internal) 2nd Exam Marker']):
-            leaders.append(row['(UGO Internal) 2nd Exam Marker'])
-        name = row['Module Name']
-        code = row['Banner Code (New CR)']
-        if pd.isna(code) or pd.isna(name) :
-            continue
-        if len(leaders) == 0 :
-            continue
-        combined_name = f"{code} {name}"
-        best_match, score, _ = process.extractOne(
-            combined_name, standardized_names, scorer=fuzz.token_sort_ratio
-        )
-        if score >= 70:
-            exam_types[best_match] = row['(UGO Internal) Exam Style'] if pd.notna(row['(UGO Internal) Exam Style']) else None
-            for leader in leaders:
-                if best_match not in leader_courses[leader]:
-                    leader_courses[leader].append(best_match)
-    leader_courses = dict(leader_courses)
-
-
-    for exam in exams:
-        if exam not in exam_types:
-            exam_types[exam] = "Standard"
-
-
-    exam_counts = defaultdict(lambda: [0, 0])
-    for cid, exams_taken in student_exams.items():
-        if cid in AEA:
-            for exam in exams_taken:
-                exam_counts[exam][0] += 1
-        else:
-            for exam in exams_taken:
-                exam_counts[exam][1] += 1
-
-    exam_counts = dict(exam_counts)
-
-    extra_time_students_25 = students_df[students_df.iloc[:, 3].astype(str).str.startswith(("15min/hour", "25% extra time"))].iloc[:, 0].tolist()
-    extra_time_students_50 = students_df[students_df.iloc[:, 3].astype(str).str.startswith(("30min/hour", "50% extra time"))].iloc[:, 0].tolist()
-    
-    #####----- Start running the model----####
+    cliques is the clique cover of the exam-conflict graph (see exam_cliques), shared with the preflight checks.
+    Returns (model, handles) where handles holds the decision variables and penalty lists used to
+    set the objective, add hints and read the solution. With explain=True the hard constraints are
+    guarded by assumption literals, listed in handles["guards"], for explain_infeasibility.
+    """
     model = cp_model.CpModel()
-    slots = [0, 1]
+    guard = ConstraintGuards(model, enabled=explain)
+    # Size and build time of each block below, shown in the Model diagnostics panel
+    stats = BuildStats(model)
     num_slots = len(slots)
     num_days = len(days)
     exam_day = {}
     exam_slot = {}
+    exam_period = {}
+    stats.family("Day, slot and period variables")
     for exam in exams:
         exam_day[exam] = model.NewIntVar(0, num_days - 1, f'{exam}_day')
         exam_slot[exam] = model.NewIntVar(0, num_slots - 1, f'{exam}_slot')
+        # Combined period index so clashes can be expressed with AllDifferent
+        exam_period[exam] = model.NewIntVar(0, num_days * num_slots - 1, f'{exam}_period')
+        model.Add(exam_period[exam] == exam_day[exam] * num_slots + exam_slot[exam])
+
+    # Shared one-hot period layer: exam_at[(exam, day, slot)] is true when the exam sits in that period.
+    # Every constraint and penalty below reads these instead of reifying exam_day/exam_slot again
+    exam_at = {}
+    exam_on_day = {}
+    stats.family("Shared one-hot period layer")
+    for exam in exams:
+        for d in range(num_days):
+            for s in range(num_slots):
+                exam_at[(exam, d, s)] = model.NewBoolVar(f'{exam}_at_{d}_{s}')
+        model.AddExactlyOne(exam_at[(exam, d, s)] for d in range(num_days) for s in range(num_slots))
+        model.Add(exam_day[exam] == sum(d * exam_at[(exam, d, s)] for d in range(num_days) for s in range(num_slots)))
+        model.Add(exam_slot[exam] == sum(s * exam_at[(exam, d, s)] for d in range(num_days) for s in range(num_slots)))
+        for d in range(num_days):
+            # 0/1 expression, true when the exam is on day d in either slot
+            exam_on_day[(exam, d)] = sum(exam_at[(exam, d, s)] for s in range(num_slots))
     exam_room = {}
 
-    for exam in set().union(*student_exams.values()):
-        for room in rooms:
-            exam_room[(exam, room)] = model.NewBoolVar(f'{exam}_in_{room.replace(" ", "_")}')
+    # In decomposed mode rooms are allocated per period after the period assignment is solved
+    stats.family("Room variables")
+    if not decomposed:
+        for exam in set().union(*student_exams.values()):
+            for room in rooms:
+                exam_room[(exam, room)] = model.NewBoolVar(f'{exam}_in_{room.replace(" ", "_")}')
+
+    # Pinned exams keep their (day, slot, rooms) from a previous timetable. Hard constraints that only
+    # involve pinned exams are left out, so the solver only works on the unpinned neighbourhood
+    pinned = {exam: value for exam, value in (pinned or {}).items() if exam in exam_day}
+    def only_pinned(exs):
+        return all(exam in pinned for exam in exs)
+    stats.family("Pinned exams")
+    for exam, (d, s, pinned_rooms) in pinned.items():
+        enforce = guard("Pinned exams", exam)
+        model.Add(exam_day[exam] == d).OnlyEnforceIf(enforce)
+        model.Add(exam_slot[exam] == s).OnlyEnforceIf(enforce)
+        if not decomposed:
+            for room in rooms:
+                model.Add(exam_room[(exam, room)] == int(room in pinned_rooms)).OnlyEnforceIf(enforce)
+    if pinned:
+        logger.info(f"{len(pinned)} exams pinned, re-optimising {len(exams) - len(pinned)}")
 
 #####----Adding constraints ------####
-    # 0. Students can't have exams at the same tiem
-    for student, exs in student_exams.items():
-    #Loops through students
-        for i in range(len(exs)):
-            for j in range(i + 1, len(exs)):
-                exam1 = exs[i]
-                exam2 = exs[j]
-                #Boolean variables for day and slot matches
-                same_day = model.NewBoolVar(f'{exam1}_same_day{exam2}')
-                same_slot = model.NewBoolVar(f'{exam1}_same_slot{exam2}')
-                
-                model.Add(exam_day[exam1] == exam_day[exam2]).OnlyEnforceIf(same_day)
-                model.Add(exam_day[exam1] != exam_day[exam2]).OnlyEnforceIf(same_day.Not())
-
-                model.Add(exam_slot[exam1] == exam_slot[exam2]).OnlyEnforceIf(same_slot)
-                model.Add(exam_slot[exam1] != exam_slot[exam2]).OnlyEnforceIf(same_slot.Not())
-
-                
-
-                model.AddBoolOr([same_day.Not(), same_slot.Not()])
+    # 0. Students can't have exams at the same time
+    stats.family("0. Student clashes")
+    # One AllDifferent per clique of the exam-conflict graph, so the model grows with exams rather than students
+    for clique in cliques:
+        if only_pinned(clique):
+            continue
+        model.AddAllDifferent([exam_period[exam] for exam in clique])
 
 
     # 1. Core modules can not have multiple exams on that day
-    for student, exs in student_exams.items():
+    stats.family("1. Core module days")
+    core_pairs = set()
+    for exs in exam_sets:
         core_mods = [exam for exam in exs if exam in Core_modules]
         other_mods = [exam for exam in exs if exam not in Core_modules]
         for exam in core_mods:
             for other in other_mods:
-                model.Add(exam_day[exam] != exam_day[other])
+                core_pairs.add((exam, other))
+    for exam, other in core_pairs:
+        if only_pinned((exam, other)):
+            continue
+        model.Add(exam_day[exam] != exam_day[other])
 
     # 2. Fixed modules day and slot assignment
+    stats.family("2. Fixed modules")
     for exam, (day_fixed, slot_fixed) in Fixed_modules.items():
-        model.Add(exam_day[exam] == day_fixed)
-        model.Add(exam_slot[exam] == slot_fixed)
+        if exam in pinned:
+            continue
+        enforce = guard("Fixed modules", exam)
+        model.Add(exam_day[exam] == day_fixed).OnlyEnforceIf(enforce)
+        model.Add(exam_slot[exam] == slot_fixed).OnlyEnforceIf(enforce)
 
     # 3. Forbidden exam day-slot assignments
+    stats.family("3. Forbidden dates")
     for exam in exams:
+        if exam in pinned:
+            continue
+        enforce = guard("Forbidden dates", exam)
         for day, slot in no_exam_dates:
-            model.AddForbiddenAssignments([exam_day[exam], exam_slot[exam]], [(day, slot)])
-    # 4. Max 3 exams in any 2-day window per student
-    for student, ex in student_exams.items():
-        for d in range(num_days - 1):
-            exams_in_2_days = []
-            for exam in ex:
-                is_on_d = model.NewBoolVar(f'{student}_{exam}_on_day_{d}')
-                is_on_d1 = model.NewBoolVar(f'{student}_{exam}_on_day_{d+1}')
-                is_on_either = model.NewBoolVar(f'{student}_{exam}_on_day_{d}_or_{d+1}')
-
-                model.Add(exam_day[exam] == d).OnlyEnforceIf(is_on_d)
-                model.Add(exam_day[exam] != d).OnlyEnforceIf(is_on_d.Not())
-
-                model.Add(exam_day[exam] == d + 1).OnlyEnforceIf(is_on_d1)
-                model.Add(exam_day[exam] != d + 1).OnlyEnforceIf(is_on_d1.Not())
-
-                model.AddBoolOr([is_on_d, is_on_d1]).OnlyEnforceIf(is_on_either)
-                model.AddBoolAnd([is_on_d.Not(), is_on_d1.Not()]).OnlyEnforceIf(is_on_either.Not())
-
-                exams_in_2_days.append(is_on_either)
-
-            model.Add(sum(exams_in_2_days) <= max_exams_2days)
+            model.Add(exam_at[(exam, day, slot)] == 0).OnlyEnforceIf(enforce)
+    # Per-day exam counts, built once per distinct exam set and shared by the
+    # window limits and the extra-time rules below
+    day_loads = {}
+    def get_day_load(exs):
+        exs = frozenset(exs)
+        if exs not in day_loads:
+            set_idx = len(day_loads)
+            counts = []
+            for d in range(num_days):
+                count = model.NewIntVar(0, len(exs), f'set{set_idx}_exams_day_{d}')
+                model.Add(count == sum(exam_on_day[(exam, d)] for exam in exs))
+                counts.append(count)
+            day_loads[exs] = counts
+        return day_loads[exs]
 
+    # 4. Max 3 exams in any 2-day window per student
     # 5. Max 4 exams in any 5-day sliding window per student
-    for student, exs in student_exams.items():
-        for start_day in range(num_days - 4):
-            exams_in_window = []
-            for exam in exs:
-                in_window = model.NewBoolVar(f'{student}_{exam}_in_day_{start_day}_to_{start_day + 4}')
-
-                model.AddLinearConstraint(exam_day[exam], start_day, start_day + 4).OnlyEnforceIf(in_window)
-
-                before_window = model.NewBoolVar(f'{student}_{exam}_before_{start_day}')
-                after_window = model.NewBoolVar(f'{student}_{exam}_after_{start_day + 4}')
-
-                model.Add(exam_day[exam] < start_day).OnlyEnforceIf(before_window)
-                model.Add(exam_day[exam] >= start_day).OnlyEnforceIf(before_window.Not())
-
-                model.Add(exam_day[exam] > start_day + 4).OnlyEnforceIf(after_window)
-                model.Add(exam_day[exam] <= start_day + 4).OnlyEnforceIf(after_window.Not())
-
-                model.AddBoolOr([before_window, after_window]).OnlyEnforceIf(in_window.Not())
-
-                exams_in_window.append(in_window)
-
-            model.Add(sum(exams_in_window) <= max_exams_5days)
+    # The shared per-day counts are built on first use, so they are counted in this family
+    stats.family("4-5. 2-day and 5-day limits")
+    set_students = defaultdict(list)
+    for student_group in student_classes:
+        set_students[frozenset(student_group["exams"])].extend(student_group["cids"])
+    for exs in exam_sets:
+        if only_pinned(exs):
+            continue
+        for window, max_exams in ((2, max_exams_2days), (5, max_exams_5days)):
+            if len(exs) <= max_exams:
+                continue  # Can never exceed the limit
+            counts = get_day_load(exs)
+            enforce = guard(f"{window}-day limit", describe_students(set_students[frozenset(exs)]))
+            for start_day in range(num_days - window + 1):
+                model.Add(sum(counts[start_day:start_day + window]) <= max_exams).OnlyEnforceIf(enforce)
 
     # 6. At most 1 exam in week 3 (days 13 to 20) per module leader
+    stats.family("6. Week 3 leader rule")
     for leader, leader_exams in leader_courses.items():
-        exams_in_week3 = []
-        for exam in leader_exams:
-            in_week3 = model.NewBoolVar(f'{exam}_in_week3')
-
-            model.AddLinearConstraint(exam_day[exam], 13, 20).OnlyEnforceIf(in_week3)
-
-            before_week3 = model.NewBoolVar(f'{exam}_before_week3')
-            after_week3 = model.NewBoolVar(f'{exam}_after_week3')
-
-            model.Add(exam_day[exam] < 13).OnlyEnforceIf(before_week3)
-            model.Add(exam_day[exam] >= 13).OnlyEnforceIf(before_week3.Not())
-
-            model.Add(exam_day[exam] > 20).OnlyEnforceIf(after_week3)
-            model.Add(exam_day[exam] <= 20).OnlyEnforceIf(after_week3.Not())
-
-            model.AddBoolOr([before_week3, after_week3]).OnlyEnforceIf(in_week3.Not())
-
-            exams_in_week3.append(in_week3)
-
-        model.Add(sum(exams_in_week3) <= 1)
+        if only_pinned(leader_exams):
+            continue
+        enforce = guard("Week 3 leader rule", f"{leader}: {', '.join(leader_exams)}")
+        model.Add(sum(exam_on_day[(exam, day)] for exam in leader_exams for day in range(13, 21)) <= 1).OnlyEnforceIf(enforce)
 
     # 7. Extra time 50% students: max 1 exam per day
-    for student in extra_time_students_50:
+    stats.family("7. 50% extra time")
+    for student_group in student_classes:
+        if student_group["category"] != "50% extra time":
+            continue
+        if len(student_group["exams"]) <= 1 or only_pinned(student_group["exams"]):
+            continue
+        counts = get_day_load(student_group["exams"])
+        enforce = guard("50% extra time", describe_students(student_group["cids"]))
         for day in range(num_days):
-            exams_on_day = []
-            for exam in student_exams[student]:
-                is_on_day = model.NewBoolVar(f'{student}_{exam}_on_day_{day}')
-                model.Add(exam_day[exam] == day).OnlyEnforceIf(is_on_day)
-                model.Add(exam_day[exam] != day).OnlyEnforceIf(is_on_day.Not())
-                exams_on_day.append(is_on_day)
-            model.Add(sum(exams_on_day) <= 1)
+            model.Add(counts[day] <= 1).OnlyEnforceIf(enforce)
 
     #Soft constraint that extra time students with<= 25% should only have one a day
+    stats.family("Penalty: 25% extra time")
     extra_time_25_penalties= []
-    for student in extra_time_students_25:
+    for class_idx, student_group in enumerate(student_classes):
+        if student_group["category"] != "25% extra time":
+            continue
+        if len(student_group["exams"]) <= 1:
+            continue
+        counts = get_day_load(student_group["exams"])
         for day in range(num_days):
-            exams_on_day = []
-            for exam in student_exams[student]:
-                is_on_day = model.NewBoolVar(f'{student}_{exam}_on_day_{day}')
-                model.Add(exam_day[exam] == day).OnlyEnforceIf(is_on_day)
-                model.Add(exam_day[exam] != day).OnlyEnforceIf(is_on_day.Not())
-                exams_on_day.append(is_on_day)
-            num_exams = model.NewIntVar(0, len(exams_on_day), f'{student}_num_exams_day_{day}')
-            model.Add(num_exams == sum(exams_on_day))
-            has_multiple_exams = model.NewBoolVar(f'{student}_more_than_one_exam_day_{day}')
+            num_exams = counts[day]
+            has_multiple_exams = model.NewBoolVar(f'class{class_idx}_more_than_one_exam_day_{day}')
             model.Add(num_exams >= 2).OnlyEnforceIf(has_multiple_exams)
             model.Add(num_exams < 2).OnlyEnforceIf(has_multiple_exams.Not())
-            penalty = model.NewIntVar(0, 5, f'{student}_penalty_day_{day}')
+            penalty = model.NewIntVar(0, 5, f'class{class_idx}_penalty_day_{day}')
             model.Add(penalty == 5).OnlyEnforceIf(has_multiple_exams)
             model.Add(penalty == 0).OnlyEnforceIf(has_multiple_exams.Not())
-            extra_time_25_penalties.append(penalty)
+            # Weighted by class size so the objective matches one penalty per student
+            extra_time_25_penalties.append(len(student_group["cids"]) * penalty)
 
     #Soft constraint that course leaders modules should be spread out
+    stats.family("Penalty: module leader spread")
     spread_penalties =[]
     for leader in leader_courses:
         mods = leader_courses[leader]
@@ -546,45 +436,20 @@ def create_timetable(students_df, leaders_df, wb,max_exams_2days, max_exams_5day
                 spread_penalties.append(close_penalty)
 
     #Soft constraint to ensure no exams on some days
+    stats.family("Penalty: soft exam days")
     soft_day_penalties = []
     for exam in exams:
         for day, slot in no_exam_dates_soft:
-            is_on_soft_day = model.NewBoolVar(f'{exam}_on_soft_day_{day}_{slot}')
-            day_match = model.NewBoolVar(f'{exam}_day_eq_{day}')
-            slot_match = model.NewBoolVar(f'{exam}_slot_eq_{slot}')
-            model.Add(exam_day[exam] == day).OnlyEnforceIf(day_match)
-            model.Add(exam_day[exam] != day).OnlyEnforceIf(day_match.Not())
-            model.Add(exam_slot[exam] == slot).OnlyEnforceIf(slot_match)
-            model.Add(exam_slot[exam] != slot).OnlyEnforceIf(slot_match.Not())
-            model.AddBoolAnd([day_match, slot_match]).OnlyEnforceIf(is_on_soft_day)
-            model.AddBoolOr([day_match.Not(), slot_match.Not()]).OnlyEnforceIf(is_on_soft_day.Not())
-            penalty = model.NewIntVar(0, 5, f'{exam}_penalty_soft_day_{day}_{slot}')
-            model.Add(penalty == 5).OnlyEnforceIf(is_on_soft_day)
-            model.Add(penalty == 0).OnlyEnforceIf(is_on_soft_day.Not())
-            soft_day_penalties.append(penalty)
+            soft_day_penalties.append(5 * exam_at[(exam, day, slot)])
 
     #Minimize the amount of exams per slot 
+    stats.family("Penalty: crowded slots")
     soft_slot_penalties = []
 
     for day in range(15):  #1 First two weeks only
         for slot in slots:  
-            exams_in_slot = []
-                
-                    # 2 Make a list of all exams in a slot
-            for exam in exams:
-                is_scheduled_day = model.NewBoolVar(f'{exam}_is_on_day{day}')
-                is_scheduled_slot = model.NewBoolVar(f'{exam}_is_on_slot{slot}')
-
-                model.Add(exam_day[exam] == day).OnlyEnforceIf(is_scheduled_day)
-                model.Add(exam_day[exam] != day).OnlyEnforceIf(is_scheduled_day.Not())
-
-                model.Add(exam_slot[exam] == slot).OnlyEnforceIf(is_scheduled_slot)
-                model.Add(exam_slot[exam] != slot).OnlyEnforceIf(is_scheduled_slot.Not())
-                
-                is_scheduled_here = model.NewBoolVar(f'{exam}_on_day{day}_slot{slot}')
-                model.AddBoolAnd([is_scheduled_day, is_scheduled_slot]).OnlyEnforceIf(is_scheduled_here)
-                model.AddBoolOr([is_scheduled_day.Not(), is_scheduled_slot.Not()]).OnlyEnforceIf(is_scheduled_here.Not())
-                exams_in_slot.append(is_scheduled_here)
+            # 2 Make a list of all exams in a slot
+            exams_in_slot = [exam_at[(exam, day, slot)] for exam in exams]
 
             # 3 Count number of exams scheduled in this (day, slot)
             num_exams_here = model.NewIntVar(0, len(exams), f'count_day{day}_slot{slot}')
@@ -614,274 +479,415 @@ def create_timetable(students_df, leaders_df, wb,max_exams_2days, max_exams_5day
             soft_slot_penalties.append(penalty_four)
 
    ####- room constraints - ####
-    # Ensure each non ME exam is assigned room N/A and ME is not assingned this
-    for exam in exams:
-        if exam in Fixed_modules and exam not in Core_modules:
-            model.Add(exam_room[(exam, 'NON ME N/A')] ==1)  # Assign to N/A room if fixed module
-        else:
-            model.Add(exam_room[(exam, 'NON ME N/A')] == 0)  # Do not assign to N/A room if not fixed module
+    # Non ME fixed modules go in the N/A room
+    na_exams = [exam for exam in exams if exam in Fixed_modules and exam not in Core_modules]
+    if decomposed:
+        # Phase 1 only checks aggregate room capacity in each period
+        stats.family("Room capacity per period")
+        room_surplus = []
+        non_pc_exam_penalty = []
+        for d in range(num_days):
+            for s in range(num_slots):
+                add_period_capacity_constraints(
+                    model, [(exam, exam_at[(exam, d, s)]) for exam in exams], exam_counts, exam_types, rooms, na_exams,
+                    f"{days[d]} {['Morning', 'Afternoon'][s]}", guard,
+                )
+    else:
+        stats.family("Room capacity, PC rooms and room surplus")
+        room_surplus, non_pc_exam_penalty = add_room_constraints(
+            model, exam_room, exams, exam_counts, exam_types, rooms, na_exams, guard
+        )
 
+        #Ensure each room holds at most one exam per day and slot
+        # One optional unit-length interval per (exam, room) on the period axis, present when the room is used,
+        # so the encoding grows with rooms x exams rather than rooms x exams x periods
+        stats.family("Room double-booking")
+        for room in rooms:
+            if room == 'NON ME N/A':
+                continue  # Skip N/A room for this constraint 
+            room_intervals = []
+            for exam in exams:
+                room_intervals.append(model.NewOptionalFixedSizeIntervalVar(
+                    exam_period[exam], 1, exam_room[(exam, room)], f'{exam}_in_{room}'))
+            model.AddNoOverlap(room_intervals)
+
+    stats.finish()
+
+    handles = {
+        "exam_day": exam_day,
+        "exam_slot": exam_slot,
+        "exam_at": exam_at,
+        "exam_room": exam_room,
+        "na_exams": na_exams,
+        "spread_penalties": spread_penalties,
+        "soft_day_penalties": soft_day_penalties,
+        "extra_time_25_penalties": extra_time_25_penalties,
+        "room_surplus": room_surplus,
+        "soft_slot_penalties": soft_slot_penalties,
+        "non_pc_exam_penalty": non_pc_exam_penalty,
+        "guards": guard.items,
+        "build_stats": stats.families,
+    }
+    return model, handles
 
-    #Must have sufficient room for each exam 
-    for exam in exams:
+def load_dataset(students, leaders_df, dates, profiler=None, match_store=None):
+    """Derive everything create_timetable needs from the input files.
 
-        AEA_capacity = sum(
-            rooms[room][1] * exam_room[(exam, room)]
-            for room in rooms if "AEA" in rooms[room][0]
-        )
-        SEQ_capacity = sum(
-            rooms[room][1] * exam_room[(exam, room)]
-            for room in rooms if "SEQ" in rooms[room][0]
-        )
-        AEA_students = exam_counts[exam][0]
-        SEQ_students = exam_counts[exam][1]
-        model.Add(AEA_capacity >= AEA_students)
-        model.Add(SEQ_capacity >= SEQ_students)
-
-    #Ensure only one day and slot assigned to each room
-    for d in range(num_days):
-        for s in range(num_slots):
-            for room in rooms:
-                if room == 'NON ME N/A':
-                    continue  # Skip N/A room for this constraint 
-                else:
-                    exams_in_room_time = []
-                    for exam in exams:
-                        exam_at_day = model.NewBoolVar(f'{exam}_on_day_{d}')
-                        model.Add(exam_day[exam] == d).OnlyEnforceIf(exam_at_day)
-                        model.Add(exam_day[exam] != d).OnlyEnforceIf(exam_at_day.Not())
-
-                        exam_at_slot = model.NewBoolVar(f'{exam}_on_slot_{s}')
-                        model.Add(exam_slot[exam] == s).OnlyEnforceIf(exam_at_slot)
-                        model.Add(exam_slot[exam] != s).OnlyEnforceIf(exam_at_slot.Not())
-
-                        exam_at_time = model.NewBoolVar(f'{exam}_on_{d}_{s}')
-                        model.AddBoolAnd([exam_at_day, exam_at_slot]).OnlyEnforceIf(exam_at_time)
-                        model.AddBoolOr([exam_at_day.Not(), exam_at_slot.Not()]).OnlyEnforceIf(exam_at_time.Not())
-
-                        assigned_and_scheduled = model.NewBoolVar(f'{exam}_in_{room}_at_{d}_{s}')
-                        model.AddBoolAnd([exam_room[(exam, room)], exam_at_time]).OnlyEnforceIf(assigned_and_scheduled)
-                        model.AddBoolOr([exam_room[(exam, room)].Not(), exam_at_time.Not()]).OnlyEnforceIf(assigned_and_scheduled.Not())
-
-                        exams_in_room_time.append(assigned_and_scheduled)
-                    model.AddAtMostOne(exams_in_room_time)
-
-    #Ensure non computer rooms not used for computer exams
-    for exam in exams:
-        if exam_types[exam] == "PC":
-            for room in rooms:
-                uses = rooms[room][0]
-                if "Computer" not in uses:
-                    model.Add(exam_room[(exam, room)] == 0)
+    Returns a dict with the exams, the StudentList, the exam days (names and ISO dates), the bank holidays (as day offsets), the module
+    leaders' exams, the exam types and the module-to-exam match table, or None if the useful dates can't be read. It only holds plain values, so it
+    can be cached across reruns and sessions (see DatasetCache). Matches stored in match_store are reused and new
+    unambiguous ones are added to it.
+    """
+    profiler = profiler or PhaseProfiler()
+    # students is the StudentList from process_files, a raw student list DataFrame is parsed here
+    if not isinstance(students, StudentList):
+        with profiler.phase("Student-exam parsing"):
+            students = parse_student_list(students)
+    # Exam names from row 0, starting from column J (index 9)
+    exams = students.exams
 
-    # Minimize amount of rooms used
-    room_surplus = []
-    for exam in exams:
-        model.Add(sum(exam_room[(exam, room)] for room in rooms) >= 1)
-        rooms_len = model.NewIntVar(0, 9, f'rooms for {exam}')
-
-        model.Add(rooms_len == sum(exam_room[(exam, room)]for room in rooms))
-        rooms_penalty = model.NewIntVar(0, 15, f'{exam}_room_surplus_penalty')
-
-        is_room_length_greater_6 = model.NewBoolVar(f'{exam}_has_six_or_more_rooms')
-        is_room_length_5 = model.NewBoolVar(f'{exam}_has_five_rooms')
-        is_room_length_4 = model.NewBoolVar(f'{exam}_has_four_rooms')
-        is_room_length_3 = model.NewBoolVar(f'{exam}_has_three_rooms')
-
-        model.Add(rooms_len >= 6).OnlyEnforceIf(is_room_length_greater_6)
-        model.Add(rooms_len <= 5).OnlyEnforceIf(is_room_length_greater_6.Not())
-        model.Add(rooms_len == 5).OnlyEnforceIf(is_room_length_5)
-        model.Add(rooms_len != 5).OnlyEnforceIf(is_room_length_5.Not())
-        model.Add(rooms_len == 4).OnlyEnforceIf(is_room_length_4)
-        model.Add(rooms_len != 4).OnlyEnforceIf(is_room_length_4.Not())
-        model.Add(rooms_len == 3).OnlyEnforceIf(is_room_length_3)
-        model.Add(rooms_len != 3).OnlyEnforceIf(is_room_length_3.Not())
-
-        model.add(rooms_penalty == 15).OnlyEnforceIf(is_room_length_greater_6)
-        model.Add(rooms_penalty == 9).OnlyEnforceIf(is_room_length_5)
-        model.Add(rooms_penalty == 6).OnlyEnforceIf(is_room_length_4)
-        model.Add(rooms_penalty == 4).OnlyEnforceIf(is_room_length_3)
-        model.Add(rooms_penalty == 0).OnlyEnforceIf(
-                    is_room_length_3.Not(), is_room_length_4.Not(), is_room_length_5.Not(), is_room_length_greater_6.Not(),
-                )
-        room_surplus.append(rooms_penalty)
-    
+    # Process bank holidays and create no_exam_dates
+    bank_holidays = [(name, date.date()) for name, date in dates["bank_holidays"]]
 
-    #Penalise using pc rooms for non pc exams
+    # Find Summer Term start date
+    summer_start = None
+    term_range = dates["summer_term"]
+    if term_range:
+        try:
+            start_part = term_range.split("to")[0].strip()
+            start_str = re.sub(r"^\w+\s+", "", start_part)
+            year_match = re.search(r"\b\d{4}\b", term_range)
+            if year_match:
+                start_str += f" {year_match.group(0)}"
+            else:
+                st.error("Year not found in date range.")
+                return None
+            summer_start = parse(start_str, dayfirst=True).date()
+        except Exception as e:
+            st.error(f"Could not parse Summer Term start: {term_range}")
+            return None
+    if not summer_start:
+        st.error("Summer Term start date not found")
+        return None
+    
+    # Find first Monday
+    first_monday = summer_start
+    while first_monday.weekday() != 0:
+        first_monday += timedelta(days=1)
+    bank_holiday_days = []
+    for name, bh_date in bank_holidays:
+        delta = (bh_date - first_monday).days
+        if 0 <= delta <= 20:
+            bank_holiday_days.append(delta)
 
-    non_pc_exam_penalty = []
+    #Get the list of days from useful dates
+    days = []
+    dates = []
+    for i in range(21):
+        date = first_monday + timedelta(days=i)
+        day_str = date.strftime("%A ") + ordinal(date.day) + date.strftime(" %B")
+        days.append(day_str)
+        dates.append(date.isoformat())
+    
+    with profiler.phase("Fuzzy matching"):
+        modules = []
+        module_leaders = []
+        for row in leaders_df.to_dict("records"):
+            leaders = []
+            if pd.notna(row['Module Leader (lecturer 1)']):
+                leaders.append(row['Module Leader (lecturer 1)'])
+            if pd.notna(row['(UGO Internal) 2nd Exam Marker']):
+                leaders.append(row['(UGO Internal) 2nd Exam Marker'])
+            name = row['Module Name']
+            code = row['Banner Code (New CR)']
+            if pd.isna(code) or pd.isna(name) :
+                continue
+            if len(leaders) == 0 :
+                continue
+            modules.append((code, name))
+            module_leaders.append((leaders, row['(UGO Internal) Exam Style']))
+        # Stored matches and overrides first, then exact Banner code lookups, then one batched fuzzy pass for the rest
+        module_matches = match_modules(modules, exams, match_store.known() if match_store is not None else None)
+        if match_store is not None:
+            match_store.remember(module_matches)
+
+        leader_courses = defaultdict(list)
+        exam_types = dict()
+        for match, (leaders, style) in zip(module_matches, module_leaders):
+            best_match = match["Exam"]
+            if best_match is None:
+                continue
+            exam_types[best_match] = style if pd.notna(style) else None
+            for leader in leaders:
+                if best_match not in leader_courses[leader]:
+                    leader_courses[leader].append(best_match)
+        leader_courses = dict(leader_courses)
 
-    #1 Find computer rooms
-    computer_rooms = [room for room in rooms if "Computer" in rooms[room][0]]
 
-    #2 Loop through exams
     for exam in exams:
-            #3 if not a PC exams
-        if exam_types[exam] != "PC":
-                #4 Check each computer room
-            for room in computer_rooms:
-                #5 Create a Boolean 
-                penalty_var = model.NewBoolVar(f"non_pc_exam_in_pc_room_{exam}_{room}")
-                
-                #6 Assign penalty 
-                model.Add(exam_room[(exam, room)] == 1).OnlyEnforceIf(penalty_var)
-                model.Add(exam_room[(exam, room)] != 1).OnlyEnforceIf(penalty_var.Not())
-
-                #7 Add penality
-                non_pc_exam_penalty.append(5 * penalty_var)
-            
+        if exam not in exam_types:
+            exam_types[exam] = "Standard"
+
+    return {
+        "exams": exams,
+        "students": students,
+        "days": days,
+        "dates": dates,
+        "bank_holidays": bank_holiday_days,
+        "leader_courses": leader_courses,
+        "exam_types": exam_types,
+        "module_matches": module_matches,
+    }
+
+def create_timetable(dataset, max_exams_2days, max_exams_5days, decomposed=False, solver_preset=None, prior_timetable=None, pinned=None, progress=None, model_cache=None, profiler=None):
+    profiler = profiler or PhaseProfiler()
+    # The dataset is shared through the dataset cache, so nothing in it is modified here
+    students = dataset["students"]
+    exams = dataset["exams"]
+    days = dataset["days"]
+    leader_courses = dataset["leader_courses"]
+    exam_types = dataset["exam_types"]
+    for delta in dataset["bank_holidays"]:
+        for slot in (0, 1):
+            if [delta, slot] not in no_exam_dates:
+                no_exam_dates.append([delta, slot])
+
+    #Form dictionary of student_exams
+    with profiler.phase("Student-exam parsing"):
+        student_exams = students.student_exams()
+    AEA = students.aea_cids()
+
+    with profiler.phase("Student-exam parsing"):
+        exam_counts = students.exam_counts()
+        extra_time_students_25 = students.extra_time_25_cids()
+        extra_time_students_50 = students.extra_time_50_cids()
+
+        # Students with the same exams and category are interchangeable, so student constraints are built per class
+        student_classes, student_class = group_students(student_exams, AEA, extra_time_students_25, extra_time_students_50)
+        exam_sets = list({frozenset(c["exams"]) for c in student_classes})
+    logger.info(f"{len(student_exams)} students grouped into {len(student_classes)} classes and {len(exam_sets)} distinct exam sets")
+    # The conflict graph and its clique cover are built once, for the preflight checks and the model
+    with profiler.phase("Conflict graph"):
+        conflict_graph = build_conflict_graph(student_exams)
+        cliques = exam_cliques(conflict_graph)
+    logger.info(f"Exam-conflict graph: {len(exams)} exams, {len(conflict_graph)} conflicting pairs, {len(cliques)} cliques")
+
+    #####----- Start running the model----####
+    slots = [0, 1]
+    num_slots = len(slots)
+    num_days = len(days)
+    pinned = {exam: value for exam, value in (pinned or {}).items() if exam in exams}
+    if progress is None:
+        progress = SolveProgress()
+
+    # Reject inputs that can't be timetabled before spending any solver time
+    t = time.time()
+    errors, warnings = preflight_checks(
+        exams, num_days, slots, no_exam_dates, cliques, student_classes, exam_counts, exam_types,
+        leader_courses, rooms, Fixed_modules, Core_modules, max_exams_2days, max_exams_5days, pinned,
+    )
+    logger.info(f"Preflight checks: {len(errors)} errors, {len(warnings)} warnings in {time.time() - t:.3f} s")
+    progress.preflight_errors = errors
+    progress.preflight_warnings = warnings
+    if errors:
+        st.error("Preflight checks failed:\n" + "\n".join(errors))
+        return None
+
+    # The constraint set only depends on the data and the hard parameters, so a cached copy is reused
+    # when only the penalty weight sliders change and just the objective is swapped
+    cache_key = model_cache_key(
+        exams, days, sorted([sorted(c["exams"]), c["category"], len(c["cids"])] for c in student_classes),
+        leader_courses, exam_counts, exam_types, rooms, Fixed_modules, Core_modules,
+        sorted(set(map(tuple, no_exam_dates))), no_exam_dates_soft,
+        max_exams_2days, max_exams_5days, decomposed, pinned,
+    )
+    with profiler.phase("Model build"):
+        cached = model_cache.get(cache_key) if model_cache is not None else None
+        if cached is not None:
+            logger.info("Reusing cached model")
+            model, handles = cached
+        else:
+            model, handles = build_model(
+                exams, days, slots, student_exams, student_classes, exam_sets, cliques, leader_courses, exam_counts, exam_types,
+                max_exams_2days, max_exams_5days, decomposed, pinned,
+            )
+            if model_cache is not None:
+                model_cache.put(cache_key, model, handles)
+    exam_day = handles["exam_day"]
+    exam_slot = handles["exam_slot"]
+    exam_at = handles["exam_at"]
+    exam_room = handles["exam_room"]
+    na_exams = handles["na_exams"]
+    spread_penalties = handles["spread_penalties"]
+    soft_day_penalties = handles["soft_day_penalties"]
+    extra_time_25_penalties = handles["extra_time_25_penalties"]
+    room_surplus = handles["room_surplus"]
+    soft_slot_penalties = handles["soft_slot_penalties"]
+    non_pc_exam_penalty = handles["non_pc_exam_penalty"]
+
     model.Minimize(sum(spread_penalties) + sum(soft_day_penalties)*soft_day_penalty+   sum(extra_time_25_penalties)*extra_time_penalty+sum(room_surplus)+ sum(soft_slot_penalties)+ sum(non_pc_exam_penalty)*room_penalty)
    
+    # Warm start from a previous timetable (dict from a past run or an uploaded Excel in the generator's layout)
+    if prior_timetable is not None and not isinstance(prior_timetable, dict):
+        # Rows on days or slots this calendar doesn't have are left out, a warm start must not fail the run
+        prior_timetable = file_reading(prior_timetable, days, slots, strict=False)
+    hint_rooms = {}
+    if prior_timetable:
+        skipped = 0
+        for exam, (d, s, hinted_rooms) in prior_timetable.items():
+            # Skip exams or days that no longer exist in this run
+            if exam not in exam_day or not 0 <= d < num_days or s not in slots:
+                skipped += 1
+                continue
+            model.AddHint(exam_day[exam], d)
+            model.AddHint(exam_slot[exam], s)
+            for dd in range(num_days):
+                for ss in range(num_slots):
+                    model.AddHint(exam_at[(exam, dd, ss)], int((dd, ss) == (d, s)))
+            hint_rooms[exam] = [room for room in hinted_rooms if room in rooms]
+            if not decomposed:
+                for room in rooms:
+                    model.AddHint(exam_room[(exam, room)], int(room in hint_rooms[exam]))
+        logger.info(f"Warm start: hinted {len(hint_rooms)} of {len(exams)} exams, "
+                    f"skipped {skipped} exams or days that are not in this run")
+
     #### ----- Solve the model ----- ###
     solver = cp_model.CpSolver()
-    # set max time
-    solver.parameters.max_time_in_seconds = 120 
-    status = solver.Solve(model)
+    # Time limit, workers, seed, gap and logging come from the chosen preset
+    apply_preset(solver, solver_preset if solver_preset is not None else load_presets()[DEFAULT_PRESET])
+    # Always keep the search log for the presolve statistics, it only goes to stdout if the preset logs
+    log_lines = []
+    solver.parameters.log_to_stdout = solver.parameters.log_search_progress
+    solver.parameters.log_search_progress = True
+    solver.log_callback = log_lines.append
+    # Objective terms per penalty family and their weights, streamed to the page with each solution
+    penalty_families = {
+        "Module leader spread": (spread_penalties, 1),
+        "Soft exam days": (soft_day_penalties, soft_day_penalty),
+        "25% extra time": (extra_time_25_penalties, extra_time_penalty),
+        "Room surplus": (room_surplus, 1),
+        "Crowded slots": (soft_slot_penalties, 1),
+        "Non-PC exams in PC rooms": (non_pc_exam_penalty, room_penalty),
+    }
+    with profiler.phase("Solve"):
+        progress.track(solver, penalty_families, "Assigning days and slots" if decomposed else "Solving")
+        status = solver.Solve(model, progress)
+
+        room_allocation = {}
+        if decomposed:
+            # Phase 2: pack rooms for every period in parallel. A group of exams that can't be packed
+            # is stopped from sharing any period and the period assignment is solved again
+            for attempt in range(max_room_rounds):
+                if status != cp_model.FEASIBLE and status != cp_model.OPTIMAL:
+                    break
+                period_exams = defaultdict(list)
+                for exam in exams:
+                    period_exams[(solver.Value(exam_day[exam]), solver.Value(exam_slot[exam]))].append(exam)
+                progress.phase = "Allocating rooms"
+                room_allocation = allocate_rooms(period_exams, exam_counts, exam_types, rooms, na_exams, room_penalty,
+                                                 hint_rooms=hint_rooms,
+                                                 fixed_rooms={exam: value[2] for exam, value in pinned.items()})
+                failed = [period for period, result in room_allocation.items() if not result["ok"]]
+                if not failed or progress.stop_requested:
+                    break
+                logger.info(f"Room allocation failed for periods {failed}, re-solving period assignment")
+                for period in failed:
+                    group = period_exams[period]
+                    for d in range(num_days):
+                        for s in range(num_slots):
+                            model.Add(sum(exam_at[(exam, d, s)] for exam in group) <= len(group) - 1)
+                # Restart from the last period assignment
+                model.ClearHints()
+                for exam in exams:
+                    model.AddHint(exam_day[exam], solver.Value(exam_day[exam]))
+                    model.AddHint(exam_slot[exam], solver.Value(exam_slot[exam]))
+                progress.track(solver, penalty_families, f"Re-assigning days and slots (round {attempt + 2})")
+                status = solver.Solve(model, progress)
+                room_allocation = {}
+            if any(not result["ok"] for result in room_allocation.values()):
+                room_allocation = {}
+
+    progress.diagnostics = solve_diagnostics(
+        model, solver, status, handles.get("build_stats", []), cached is not None, penalty_families, log_lines
+    )
+    if decomposed and progress.diagnostics["objective_contributions"]:
+        progress.diagnostics["objective_contributions"]["Room surplus"] += sum(
+            result["room_surplus"] for result in room_allocation.values()
+        )
+    if decomposed and status in (cp_model.FEASIBLE, cp_model.OPTIMAL) and not room_allocation:
+        st.error(f"Rooms could not be allocated after {max_room_rounds} rounds.")
+        return None
+
     if status == cp_model.FEASIBLE or status == cp_model.OPTIMAL:
         exams_timetabled = {}
         for exam in exams:
             d = solver.Value(exam_day[exam])
             s = solver.Value(exam_slot[exam])
-            assigned_rooms = [room for room in rooms if solver.Value(exam_room[(exam, room)]) == 1]
+            if decomposed:
+                assigned_rooms = room_allocation[(d, s)]["rooms"][exam]
+            else:
+                assigned_rooms = [room for room in rooms if solver.Value(exam_room[(exam, room)]) == 1]
             try:
                 leader = [name for name, exams in leader_courses.items() if exam in exams][0]
             except IndexError:
                 leader = "unknown"
             exams_timetabled[exam] = (d, s, assigned_rooms)
 
-        # Save data for next page to pickle - unpacked when generation finished and in main scope
-        data_to_save ={
-            "days": days,
-            "slots": [0, 1],
-            "exams": exams,
-            "AEA": AEA,
-            "leader_courses": leader_courses,
-            "extra_time_students_25": extra_time_students_25,
-            "extra_time_students_50": extra_time_students_50,
-            "student_exams": student_exams,
-            "exam_counts": exam_counts,
-            "Fixed_modules": Fixed_modules,
-            "Core_modules": Core_modules,
-            "rooms": rooms,
-            "exam_types": exam_types,
-        }
-        pickle_buffer = BytesIO()
-        pickle.dump(data_to_save, pickle_buffer)
-        pickle_buffer.seek(0)
         total_penalty = sum(solver.Value(v) for v in spread_penalties + soft_day_penalties + room_surplus +extra_time_25_penalties)
-        return exams_timetabled, days, exam_counts, exam_types,total_penalty, pickle_buffer
+        total_penalty += sum(result["room_surplus"] for result in room_allocation.values())
+
+        # How much of the warm start survived: day, slot and each room membership count as one value
+        hint_stats = {"hinted": 0, "kept": 0}
+        for exam, hinted_rooms in hint_rooms.items():
+            hinted_day, hinted_slot = prior_timetable[exam][0], prior_timetable[exam][1]
+            d, s, assigned_rooms = exams_timetabled[exam]
+            hint_stats["hinted"] += 2 + len(rooms)
+            hint_stats["kept"] += int(d == hinted_day) + int(s == hinted_slot)
+            hint_stats["kept"] += sum(1 for room in rooms if (room in hinted_rooms) == (room in assigned_rooms))
+        objective = dict(progress.diagnostics["objective_contributions"]) if progress.diagnostics else {}
+        result = TimetableResult(
+            exams_timetabled, days, dataset["dates"], slots, exams, exam_counts, exam_types, total_penalty, objective,
+            hint_stats, students.compact(), leader_courses, rooms, Fixed_modules, Core_modules,
+        )
+        return result
     
     elif status == cp_model.INFEASIBLE:
-        # print infeasible boolean variables index
-        st.error('Infeasible model. Exam schedule could not be created.')
+        # Rebuild with guarded hard constraints and solve for feasibility only, assuming every guard,
+        # to find which constraint families (and which exams, students or leaders) can't hold together.
+        # UNKNOWN (time limit or stop before a first solution) is not explained, as it proves nothing
+        progress.phase = "Explaining infeasibility"
+        explain_model, explain_handles = build_model(
+            exams, days, slots, student_exams, student_classes, exam_sets, cliques, leader_courses, exam_counts, exam_types,
+            max_exams_2days, max_exams_5days, decomposed, pinned, explain=True,
+        )
+        explain_status, conflicts = explain_infeasibility(
+            explain_model, explain_handles["guards"], min(EXPLAIN_TIME_LIMIT, solver.parameters.max_time_in_seconds),
+            progress,
+        )
+        if explain_status != cp_model.INFEASIBLE:
+            progress.failure = "Infeasible model. The conflicting constraints could not be narrowed down in time."
+            st.error(progress.failure)
+            return None
+        progress.conflicts = conflicts
+        if conflicts:
+            logger.info("Conflicting hard constraints: " + "; ".join(
+                f"{family} ({len(details)}, {len(undecided)} undecided: {', '.join(map(str, details[:5]))})"
+                for family, details, undecided in conflicts))
+        progress.failure = "Infeasible model. Exam schedule could not be created."
+        st.error(progress.failure)
+    elif status == cp_model.UNKNOWN:
+        # Neither a timetable nor a proof that none exists, so there is nothing to explain yet
+        if progress.stop_requested:
+            progress.failure = "Stopped before a first timetable was found, so feasibility is still open."
+        else:
+            progress.failure = ("The solver hit its time limit before finding a timetable or proving that none "
+                                "exists. Try a longer preset, or relax the hard limits to see whether they are the cause.")
+        st.error(progress.failure)
     else:
         st.error("No solution found.")
 
 
 
-def generate_excel(exams_timetabled, days, exam_counts, exam_types):
-    # ------------ BUILD rows and row_meta ------------
-    data = {}
-    for exam, (d, s, room, *_) in exams_timetabled.items():
-        day = days[d]
-        slot = s
-        data.setdefault(day, {}).setdefault(slot, []).append((exam, room))
-
-    rows = []
-    row_meta = []
-
-    for d_idx, day_name in enumerate(days):
-        for s_idx, slot_name in enumerate(['Morning', 'Afternoon']):
-            exams_list = data.get(day_name, {}).get(s_idx, [])
-            if not exams_list: # No exams scheduled e.g. weekend
-                rows.append([day_name, slot_name, '', '', '', ''])
-                row_meta.append((d_idx, s_idx))
-            else:
-                for exam_name, room in exams_list: #Get all data for the exams
-                    room_str = ', '.join(room)
-                    total_students = f'AEA {exam_counts[exam_name][0]}, Non-AEA {exam_counts[exam_name][1]}'
-                    type_str = " (Computer)" if exam_types[exam_name] == "PC" else " (Standard)"
-                    rows.append([day_name, slot_name, exam_name, total_students, room_str, type_str])
-                    row_meta.append((d_idx, s_idx))
-                rows.append([day_name, slot_name, '', '', '', ''])
-                row_meta.append((d_idx, s_idx))
-
-    # Create DataFrame
-    df = pd.DataFrame(rows, columns=['Date', 'Time', 'Exam', 'Total No of Students', 'Room', 'Type'])
-
-    # ------------ CREATE workbook and append rows ------------
-    wb = Workbook()
-    ws = wb.active
-    for r in dataframe_to_rows(df, index=False, header=True):
-        ws.append(r)
-
-    # ------------ FUNCTION to merge vertical cells ------------
-    def merge_vertical(col, key_fn):
-        start = 2
-        last_key = key_fn(start)
-        for r in range(3, ws.max_row + 2): #Start from row 3 as this is where data starts
-            key = key_fn(r) if r <= ws.max_row else None
-            if key != last_key:
-                if r - start > 1:
-                    ws.merge_cells(start_row=start, start_column=col, end_row=r-1, end_column=col)
-                start = r
-                last_key = key
-
-    # Merge Time cells: consecutive identical (Date, Time) pairs
-    merge_vertical(2, lambda r: (ws.cell(r,1).value, ws.cell(r,2).value))
-    # Merge Date cells: all rows for the same day
-    merge_vertical(1, lambda r: ws.cell(r, 1).value)
-
-    # ------------ DEFINE fills ------------
-    yellow = PatternFill('solid', fgColor='FFFF54')  # Fixed modules
-    red = PatternFill('solid', fgColor='EA3323')     # Core modules
-    blue = PatternFill('solid', fgColor='E0EAF6')    # Alternating row color
-    green = PatternFill('solid', fgColor='CBE9B8')   # Alternating row color
-
-    # ------------ APPLY alternating row fills BY DAY ------------
-    for excel_row, (d_idx, s_idx) in enumerate(row_meta, start=2):
-        fill = blue if d_idx % 2 == 0 else green
-        for col in range(1, 7):
-            ws.cell(row=excel_row, column=col).fill = fill
-
-    # ------------ APPLY fixed/core exam coloring ------------
-    for r in range(2, ws.max_row + 1):
-        exam_name = ws.cell(r, 3).value
-        fill = None
-        if exam_name:
-            if any(exam_name.startswith(fm) for fm in Fixed_modules):
-                fill = yellow
-            if any(exam_name.startswith(cm) for cm in Core_modules):
-                fill = red
-        if fill:
-            for c in (3, 4, 5, 6):
-                ws.cell(r, c).fill = fill
-
-    # ------------ CENTER text for Date and Time columns ------------
-    for row in range(2, ws.max_row + 1):
-        for col in [1, 2]:
-            ws.cell(row=row, column=col).alignment = Alignment(vertical='center')
-
-    # ------------ AUTO-WIDTH columns ------------
-    for col in ws.columns:
-        max_length = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                cell_length = len(str(cell.value))
-                if cell_length > max_length:
-                    max_length = cell_length
-            except:
-                pass
-        ws.column_dimensions[col_letter].width = max_length + 2
-
-    # ------------ SAVE workbook to BytesIO(temporary storage) ------------
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    return output
-
 #Rotating filling animation
 def animation_html():
     return """
@@ -1106,68 +1112,269 @@ with col1:
     num_days = st.number_input("Number of Days for Exam Period", min_value=1, max_value=30, value=21) -1 # Subtract 1 to match the 0-indexed days in the code
     max_exams_2days = st.number_input("Maximum Exams in 2-Day Window", min_value=1, max_value=5, value=3)
     max_exams_5days = st.number_input("Maximum Exams in 5-Day Window", min_value=1, max_value=10, value=4)
+    solver_presets = load_presets()
+    preset_name = st.selectbox("Solver preset", list(solver_presets), index=list(solver_presets).index(DEFAULT_PRESET),
+                               help="Presets are defined in timetabling/solver_presets.json")
+    st.caption(solver_presets[preset_name].get("description", ""))
+    decomposed = st.checkbox("Allocate rooms separately for each day and slot (faster on large inputs)", value=False,
+                             help="Solves exam days and slots first, then the rooms for every period in parallel")
+    warm_start = st.radio("Warm start from", ["None", "Last generated timetable", "Uploaded timetable"], horizontal=True,
+                          help="Uses a previous timetable as the solver's starting point")
+    prior_file = None
+    if warm_start == "Uploaded timetable":
+        prior_file = st.file_uploader("Upload previous timetable", type=['xlsx'])
+    # What-if edits: keep some exams where the last run put them and re-optimise the rest
+    last_timetable = st.session_state.get("last_timetable")
+    pinned_exams = []
+    if last_timetable:
+        pinned_exams = st.multiselect("Pin exams to their current day, slot and rooms", sorted(last_timetable),
+                                      help="Pinned exams stay where the last generated timetable put them, only the others are re-optimised")
 
 with col2:
     room_penalty = st.slider("Having non PC exams in computer room penalty weight", min_value=0, max_value=10, value=5)/5 #divide by 5 to normalize it 
     extra_time_penalty = st.slider(r"25% Extra Time Students having more than one exam a day Penalty Weight", min_value=0, max_value=10, value=5)/5
     soft_day_penalty = st.slider("Soft constraint for no exams on certain days (Week 3 Tuesday and Wednesdnay Morning) Penalty Weight", min_value=0, max_value=10, value=5)/5
 
+@st.cache_resource
+def get_model_cache():
+    # One cache shared by every session; set TIMETABLE_MODEL_CACHE_DIR to also keep built models on disk
+    return ModelCache(directory=os.environ.get("TIMETABLE_MODEL_CACHE_DIR"))
+
+
+@st.cache_resource
+def get_match_store():
+    # Module-to-exam matches kept between runs and terms; TIMETABLE_MATCH_STORE sets the JSON file used
+    return MatchStore()
+
+
+@st.cache_resource
+def get_dataset_cache():
+    # Parsed input files shared by every session; set TIMETABLE_DATASET_CACHE_DIR to also keep Arrow snapshots on disk
+    return DatasetCache(directory=os.environ.get("TIMETABLE_DATASET_CACHE_DIR"))
+
+
+def show_progress(progress):
+    # Live view of the running solve: latest objective, bound and gap plus the penalty breakdown
+    phase, solutions = progress.latest()
+    solutions = [solution for solution in solutions if solution["phase"] == phase]
+    st.subheader(f"{phase}...")
+    if not solutions:
+        components.html(animation_html(), height=350)
+        return
+    best = solutions[-1]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Objective", f"{best['objective']:.1f}")
+    col2.metric("Best bound", f"{best['bound']:.1f}")
+    col3.metric("Gap", f"{best['gap']:.1%}")
+    col4.metric("Wall time", f"{best['wall_time']:.1f} s")
+    st.line_chart(pd.DataFrame(
+        [{"Wall time (s)": s["wall_time"], "Objective": s["objective"], "Bound": s["bound"]} for s in solutions]
+    ).set_index("Wall time (s)"))
+    st.dataframe(pd.DataFrame(list(best["penalties"].items()), columns=["Penalty", "Weighted value"]), hide_index=True)
+
+
+def show_diagnostics(diagnostics):
+    # Expandable breakdown of model size and build time per constraint family plus the solver's statistics
+    if diagnostics is None:
+        return
+    with st.expander("Model diagnostics"):
+        cached = " (reused from the model cache, build times are from when it was built)" if diagnostics["cached_model"] else ""
+        st.write(f"Status {diagnostics['status']}: {diagnostics['variables']} variables and "
+                 f"{diagnostics['constraints']} constraints{cached}")
+        st.dataframe(pd.DataFrame(diagnostics["families"]).rename(columns={
+            "family": "Family", "build_time": "Build time (s)", "variables": "Variables",
+            "constraints": "Constraints", "enforcement_literals": "Enforcement literals",
+        }), hide_index=True)
+        if diagnostics["objective_contributions"]:
+            st.dataframe(pd.DataFrame(list(diagnostics["objective_contributions"].items()),
+                                      columns=["Penalty", "Objective contribution"]), hide_index=True)
+        if diagnostics["presolve"]:
+            st.text("\n".join(diagnostics["presolve"]))
+        st.text(diagnostics["response_stats"])
+        st.download_button(
+            label="Download diagnostics (JSON)",
+            data=diagnostics_json(diagnostics),
+            file_name="model_diagnostics.json",
+            mime="application/json"
+        )
+
+
+def show_bulk_export(result):
+    # ZIP of timetables per student, room and module leader, built only when the button is clicked
+    formats = st.multiselect("Bulk export formats", list(EXPORT_FORMATS), default=["csv", "ics"],
+                             format_func=EXPORT_FORMATS.get)
+
+    def archive():
+        # Streamlit serves a download from memory, so the finished ZIP is read back from its temporary file
+        with result.bulk_export(formats) as zip_file:
+            return zip_file.read()
+
+    st.download_button(
+        label="Download student, room and module leader timetables (ZIP)",
+        data=archive,
+        file_name="exam_timetables.zip",
+        mime="application/zip",
+        disabled=not formats,
+    )
+
+
+def show_module_matches(matches, exams):
+    # How each module list row was matched to an exam column, with the unmatched and ambiguous rows first.
+    # The exam column can be edited and saved as overrides that later runs use instead of matching
+    unmatched = sum(1 for match in matches if match["Exam"] is None)
+    ambiguous = sum(1 for match in matches if match["Ambiguous with"])
+    with st.expander(f"Module matching ({len(matches) - unmatched} matched, {unmatched} unmatched, {ambiguous} ambiguous)"):
+        table = pd.DataFrame(matches, columns=["Module", "Exam", "Score", "Method", "Ambiguous with", "Key"])
+        order = table["Exam"].notna().astype(int) * 2 + (table["Ambiguous with"] == "").astype(int)
+        table = table.iloc[order.argsort(kind="stable")]
+        edited = st.data_editor(
+            table, hide_index=True, key="module_match_editor",
+            disabled=["Module", "Score", "Method", "Ambiguous with"],
+            column_config={"Exam": st.column_config.SelectboxColumn(options=exams, required=False), "Key": None},
+        )
+        changed = edited[edited["Exam"].fillna("") != table["Exam"].fillna("")]
+        if st.button("Save matches", disabled=changed.empty,
+                     help="Saved matches replace the automatic ones from the next run, an empty exam leaves the module unmatched"):
+            get_match_store().override({
+                row["Key"]: (row["Exam"] if pd.notna(row["Exam"]) else None) for _, row in changed.iterrows()
+            })
+            st.success(f"Saved {len(changed)} module matches, they are used from the next run")
+
+
+def show_profile(profiler):
+    # Phase breakdown of a profiled run with the cProfile and tracemalloc output to download
+    if not profiler.enabled or not profiler.phases:
+        return
+    st.header("Profile")
+    st.dataframe(pd.DataFrame(profiler.summary()), hide_index=True)
+    st.download_button(
+        label="Download profiles (.prof and tracemalloc snapshots)",
+        data=profiler.archive(),
+        file_name="timetable_profile.zip",
+        mime="application/zip"
+    )
+
+
 # Add a generate button
-if st.button("Generate Timetable"):
-    students_df, leaders_df, wb, error = process_files()
+# Profiling is opt-in through TIMETABLE_PROFILE=1 or by opening the page with ?profile=1
+profile_runs = profiling_requested(st.query_params)
+# One solve per session at a time, a second click would leave the running one unattended
+running_job = st.session_state.get("solve_job")
+if st.button("Generate Timetable", disabled=running_job is not None and not running_job["done"]):
+    profiler = PhaseProfiler(enabled=profile_runs)
+    dataset, error = process_files(profiler, get_dataset_cache(), get_match_store())
     if not all([student_file, module_file, dates_file]):
+        profiler.finish()
         st.error("Please upload all required files first.")
     elif error is True:
+        profiler.finish()
         st.error("Please ensure files are fixed before trying again.")
     else:
-        try:
-            animation_placeholder = st.empty()
-            result_container = st.empty()
-            processing_done = False
-            error_msg = None
-            output = None
-            def generate():
-                global processing_done, error_msg, students_df, leaders_df, penalties, output, pickle_buffer
-                try:
-                    timetable, days, exam_counts, exam_types, penalties, pickle_buffer = create_timetable(
-                        students_df, leaders_df, wb, max_exams_2days, max_exams_5days,
-                    )
-                    output = generate_excel(timetable, days, exam_counts, exam_types)
-
-
-                except Exception as e:
-                    error_msg = str(e)
-                finally:
-                    processing_done = True
-            thread = threading.Thread(target=generate)
-            thread.start()
-
-            while not processing_done:
-                with animation_placeholder:
-                    components.html(animation_html(), height=350)
-                time.sleep(2.1)
-
-            animation_placeholder.empty()
-
-            if error_msg:
-                st.error(f"An error occurred: {error_msg}")
-                logger.error(f"Error generating timetable: {error_msg}", exc_info=True)
-            else:
-                pickle_buffer.seek(0)
-                data = pickle.load(pickle_buffer)
-                #Unpack the data from the temporary pickle file and write it to session state to carry across pages
-                st.session_state["exam_data"] = data
-                st.success("✅ Timetable generated successfully!")
-                st.write(f"Total Penalty: {penalties}")
-                st.download_button(
-                    label="Download Timetable",
-                    data=output,
-                    file_name="exam_schedule.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        # Session state can't be read from the worker thread, so pick the warm start here
+        prior_timetable = None
+        if warm_start == "Last generated timetable":
+            prior_timetable = st.session_state.get("last_timetable")
+            if prior_timetable is None:
+                st.warning("No timetable generated yet in this session, starting from scratch.")
+        elif warm_start == "Uploaded timetable":
+            prior_timetable = prior_file
+        pinned = {exam: last_timetable[exam] for exam in pinned_exams}
+
+        # The solve runs in a background thread and is kept in session state, so the reruns that
+        # refresh the progress view and the stop button can reach it
+        job = {"progress": SolveProgress(), "done": False, "error": None, "result": None,
+               "preset": preset_name, "stored": False, "profiler": profiler,
+               "module_matches": dataset["module_matches"], "exams": dataset["exams"]}
+        model_cache = get_model_cache()
+        def generate(job):
+            try:
+                result = create_timetable(
+                    dataset, max_exams_2days, max_exams_5days, decomposed,
+                    solver_presets[preset_name], prior_timetable, pinned, job["progress"], model_cache, job["profiler"],
                 )
-                st.header("Generated Timetable")
-                df = pd.read_excel(output)
-                st.dataframe(df)
-        except Exception as e:
-            st.error(f"Unexpected error: {str(e)}")
-
+                if result is None:
+                    raise ValueError(job["progress"].failure or "No timetable could be created with these inputs.")
+                with job["profiler"].phase("Excel write"):
+                    job["output"] = result.excel()
+                job["result"] = result
+            except Exception as e:
+                job["error"] = str(e)
+                logger.error(f"Error generating timetable: {job['error']}", exc_info=True)
+            finally:
+                job["progress"].release()
+                job["profiler"].finish()
+                job["done"] = True
+        threading.Thread(target=generate, args=(job,), daemon=True).start()
+        st.session_state["solve_job"] = job
+
+job = st.session_state.get("solve_job")
+if job is not None and not job["done"]:
+    show_progress(job["progress"])
+    if job["progress"].stop_requested:
+        st.info("Stopping, the best timetable found so far will be kept...")
+    elif st.button("Stop and keep best solution"):
+        job["progress"].stop()
+    time.sleep(2)
+    st.rerun()
+elif job is not None:
+    if job["error"]:
+        st.error(f"An error occurred: {job['error']}")
+        for preflight_error in job["progress"].preflight_errors:
+            st.error(preflight_error)
+        conflicts = job["progress"].conflicts
+        if conflicts is not None:
+            if conflicts:
+                st.subheader("Conflicting hard constraints")
+                st.write("These constraint families can't all be met at once, relaxing any one of them removes this conflict:")
+                st.dataframe(pd.DataFrame(
+                    [(family, len(details), len(undecided), ", ".join(map(str, details[:10])) + (f" and {len(details) - 10} more" if len(details) > 10 else ""))
+                     for family, details, undecided in conflicts],
+                    columns=["Constraint", "Items", "Undecided", "Applies to"],
+                ), hide_index=True)
+                undecided = sum(len(unsure) for _, _, unsure in conflicts)
+                if undecided:
+                    st.info(f"Time ran out before {undecided} of these items could be checked. They are kept in the "
+                            "list but may not be part of the conflict.")
+            else:
+                st.write("The conflict is between student clashes, core module days and room double-booking, "
+                         "which are always enforced.")
+        show_diagnostics(job["progress"].diagnostics)
+        show_module_matches(job["module_matches"], job["exams"])
+    else:
+        result = job["result"]
+        if not job["stored"]:
+            # The checker page reads the result from session state. The job stays there too for the reruns
+            # of this view, so drop what the result already holds
+            st.session_state["exam_data"] = result
+            st.session_state["last_timetable"] = result.schedule
+            del job["exams"]
+            if job["profiler"].enabled:
+                # Measuring pickles everything once, so it is only done for profiled runs
+                progress = job["progress"]
+                size = result.payload_bytes(job["output"].getvalue(), job["module_matches"], job["profiler"].packed,
+                                            progress.solutions, progress.diagnostics)
+                logger.info(f"Timetable result for the session: {size / 2 ** 20:.2f} MB")
+            job["stored"] = True
+        st.success("✅ Timetable generated successfully!")
+        for preflight_warning in job["progress"].preflight_warnings:
+            st.warning(preflight_warning)
+        st.write(f"Total Penalty: {result.penalty}")
+        st.write(f"Solver preset: {job['preset']}")
+        phase, solutions = job["progress"].latest()
+        if job["progress"].stop_requested and solutions:
+            st.write(f"Stopped early at a gap of {solutions[-1]['gap']:.1%}")
+        if result.hint_stats["hinted"]:
+            st.write(f"Warm start: {result.hint_stats['kept']} of {result.hint_stats['hinted']} hinted values kept")
+        job["output"].seek(0)
+        st.download_button(
+            label="Download Timetable",
+            data=job["output"],
+            file_name="exam_schedule.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        show_bulk_export(result)
+        show_diagnostics(job["progress"].diagnostics)
+        show_module_matches(job["module_matches"], result.exams)
+        st.header("Generated Timetable")
+        st.dataframe(result.table())
+    show_profile(job["profiler"])
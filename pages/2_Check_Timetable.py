@@ -1,88 +1,61 @@
 # Timetable Checking Page
 import streamlit as st
-import pandas as pd
-from openpyxl import load_workbook
 from collections import defaultdict
-import pickle
+from timetabling.students import describe_students
+from timetabling.schedule_io import file_reading
 
 #Main Streamlit UI for this page
 st.set_page_config(page_title="Check Timetable", layout="wide")
 st.title("Check Your Exam Timetable")
-st.markdown("""This page allows you to check your exam timetable for constraint violations as long as the timetable is formatted like the output of the generator.""")
+st.markdown("""This page allows you to check your exam timetable for constraint violations, either the one just generated or an uploaded file formatted like the output of the generator.""")
 
-#Import data from the generate page in session state
+#Import the TimetableResult from the generate page in session state
 
 data = st.session_state.get("exam_data", None)
 
 if data is not None:
     # Unpack all variables
-    days = data["days"]
-    slots = data["slots"]
-    exams = data["exams"]
-    AEA = data["AEA"]
-    leader_courses = data["leader_courses"]
-    extra_time_students_25 = data["extra_time_students_25"]
-    extra_time_students_50 = data["extra_time_students_50"]
-    student_exams = data["student_exams"]
-    exam_counts = data["exam_counts"]
-    Fixed_modules = data["Fixed_modules"]
-    Core_modules = data["Core_modules"]
-    rooms = data["rooms"]
-    exam_types = data["exam_types"]
+    days = data.days
+    slots = data.slots
+    exams = data.exams
+    leader_courses = data.leader_courses
+    exam_counts = data.exam_counts
+    Fixed_modules = data.fixed_modules
+    Core_modules = data.core_modules
+    rooms = data.rooms
+    exam_types = data.exam_types
 else:
     st.error("No exam data found. Please generate the timetable first.")
 
-def file_reading(filepath, days, slots):
-    #Read the uploaded file into a dataframe
-    df = pd.read_excel(filepath)
-    exams_timetabled = {}
-    #Build a dictionary of exams with their day, slot and room from excel timetable
-    for _, row in df.iterrows():
-        exam_name = row['Exam']
-
-
-        day_name = day_name if pd.isna(row['Date']) else row['Date']
-        slot_name = slot_name if pd.isna(row['Time']) else (0 if row['Time'] == "Morning" else 1)
-        if pd.isna(exam_name) or exam_name == '':
-            continue  # Skip empty rows
-        room = row['Room'].split(', ') if pd.notna(row['Room']) and row['Room'] else []
-
-        try:
-            d = days.index(day_name)
-            s = slots.index(slot_name)
-        except ValueError:
-            raise ValueError(f"Unrecognized day or slot in file: {day_name} / {slot_name}")
-
-        exams_timetabled[exam_name] = (d, s, room)
-
-    return exams_timetabled
-
-def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams, leader_courses, extra_time_students_50, exams, AEA,exam_counts):
+def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_classes, leader_courses, exams, exam_counts):
     def get_full_schedule(exams_timetabled, Fixed_modules):
         full_schedule = Fixed_modules.copy()
         full_schedule.update(exams_timetabled)
         return full_schedule
     
-    def check_exam_constraints(student_exams, exams_timetabled, Fixed_modules, Core_modules, module_leaders, extra_time_students_50, exams,AEA,):
+    def check_exam_constraints(student_classes, exams_timetabled, Fixed_modules, Core_modules, module_leaders, exams):
         violations = []
         schedule = get_full_schedule(exams_timetabled, Fixed_modules)
         for exam in exams:
             if exam not in schedule:
                 violations.append(f"❌ Exam '{exam}' is not scheduled in the timetable.")
 
+        # Students with the same exams and category are checked once per class
         # 0. Students can't have two exams at the same time
-        for student, exs in student_exams.items():
+        for student_group in student_classes:
+            exs = student_group["exams"]
             for i in range(len(exs)):
                 for j in range(i + 1, len(exs)):
                     exam1 = exs[i]
                     exam2 = exs[j]
                     if exams_timetabled[exam1][0] == exams_timetabled[exam2][0] and exams_timetabled[exam1][1] == exams_timetabled[exam2][1]:
                         violations.append(
-                            f"❌ Student {student} has two exams '{exam1}' and '{exam2}' at the same time "
+                            f"❌ {describe_students(student_group['cids'])}: two exams '{exam1}' and '{exam2}' at the same time "
                         )
 
         # 1. Core modules fixed: students cannot have more than one core exam on the same day            
-        for student, exs in student_exams.items():
+        for student_group in student_classes:
+            exs = student_group["exams"]
             core_mods = [exam for exam in exs if exam in Core_modules]
             other_mods = [exam for exam in exs if exam not in Core_modules]
             for core_exam in core_mods:
@@ -91,7 +64,7 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
                     other_day = exams_timetabled[other_exam][0]
                     if core_day == other_day:
                         violations.append(
-                            f"❌ Student {student} has core exam '{core_exam}' and non-core exam '{other_exam}' on the same day ({core_day})"
+                            f"❌ {describe_students(student_group['cids'])}: core exam '{core_exam}' and non-core exam '{other_exam}' on the same day ({core_day})"
                         )
         
         # 2. Other modules fixed in date/time (Fixed_modules) 
@@ -101,10 +74,10 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
                 violations.append(f"❌ Fixed module '{exam}' is not at the correct time (expected {fixed_slot}, got {scheduled_slot}).")
 
         # 3. No more than 3 exams in any 2 consecutive days (per student)
-        for student, exs in student_exams.items():
+        for student_group in student_classes:
             day_count = defaultdict(int)
 
-            for exam in exs:
+            for exam in student_group["exams"]:
                 if exam in schedule:
                     day = schedule[exam][0]
                     day_count[day] += 1
@@ -115,25 +88,25 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
                     total = day_count[day] + day_count[next_day]
                     if total > 3:
                         violations.append(
-                            f"❌ Student {student} has more than 3 exams across days {day} and {next_day}"
+                            f"❌ {describe_students(student_group['cids'])}: more than 3 exams across days {day} and {next_day}"
                         )
 
         # 4. No more than 4 exams in any 5 consecutive weekdays (Monday to Friday)
-        for student, exs in student_exams.items():
+        for student_group in student_classes:
             day_count = defaultdict(int)
-            for exam in exs:
+            for exam in student_group["exams"]:
                 if exam in schedule:
                     day = schedule[exam][0]
                     day_count[day] += 1
-        all_days = sorted(day_count.keys())
-        if all_days:
-            min_day, max_day = all_days[0], all_days[-1]
-            for start_day in range(min_day, max_day - 4 + 1):
-                total = sum(day_count.get(day, 0) for day in range(start_day, start_day + 5))
-                if total > 4:
-                    violations.append(
-                        f"❌ Student {student} has more than 4 exams from day {start_day} to {start_day + 4}"
-                    )
+            all_days = sorted(day_count.keys())
+            if all_days:
+                min_day, max_day = all_days[0], all_days[-1]
+                for start_day in range(min_day, max_day - 4 + 1):
+                    total = sum(day_count.get(day, 0) for day in range(start_day, start_day + 5))
+                    if total > 4:
+                        violations.append(
+                            f"❌ {describe_students(student_group['cids'])}: more than 4 exams from day {start_day} to {start_day + 4}"
+                        )
 
 
         # 5. Module leaders cannot have more than one exam in the third week (days 15 to 20 inclusive)                
@@ -144,29 +117,29 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
                 violations.append(f"❌ Module leader {leader} has more than one exam in week 3: {exams_in_week3}")
 
         # 6. Students with >50% extra time cannot have more than one exam on the same day        
-        for student in extra_time_students_50:
-            if student not in student_exams:
+        for student_group in student_classes:
+            if student_group["category"] != "50% extra time":
                 continue
             day_count = defaultdict(int)
-            for exam in student_exams[student]:
+            for exam in student_group["exams"]:
                 if exam in schedule:
                     day = schedule[exam][0]
                     day_count[day] += 1
             for day, count in day_count.items():
                 if count > 1:
-                    violations.append(f"❌ Student {student} with >50% extra time has {count} exams on day {day}")
+                    violations.append(f"❌ {describe_students(student_group['cids'])} with >50% extra time: {count} exams on day {day}")
         
         #7 soft Students with 25% extra time cannot have more than one exam on the same day
-        for student in AEA:
-            if student not in extra_time_students_50:
+        for student_group in student_classes:
+            if student_group["category"] in ("25% extra time", "AEA"):
                 day_count = defaultdict(int)
-                for exam in student_exams[student]:
+                for exam in student_group["exams"]:
                     if exam in schedule:
                         day = schedule[exam][0]
                         day_count[day] += 1
                 for day, count in day_count.items():
                     if count > 1:
-                        violations.append(f"⚠️soft warning Student {student} with <=25% extra time has {count} exams on day {day}")
+                        violations.append(f"⚠️soft warning {describe_students(student_group['cids'])} with <=25% extra time: {count} exams on day {day}")
         
         
         #Soft checking theres not more than two exams in any slot in the first week 
@@ -250,14 +223,12 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
         return violations
     #make list of exam violations
     violations = check_exam_constraints(
-        student_exams=student_exams,
+        student_classes=student_classes,
         exams_timetabled=exams_timetabled,
         Fixed_modules=Fixed_modules,
         Core_modules=Core_modules,
         module_leaders=leader_courses,
-        extra_time_students_50=extra_time_students_50,
         exams = exams,
-        AEA = AEA
     )
     #add list of room violations
     violations.extend(check_room_constraints(
@@ -276,6 +247,11 @@ def file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams,
 
 
 
+if data is not None and st.button("🔍 Check Generated Timetable"):
+    st.header("🔍 Check Generated Timetable")
+    # The schedule is checked as solved, without going through the Excel file
+    file_checking(data.schedule, Fixed_modules, Core_modules, data.student_classes(), leader_courses, exams, exam_counts)
+
 uploaded_file = st.file_uploader("Upload a file to check", type=["xlsx", "csv"])
 
 if st.button("🔍 Check Files"):
@@ -285,7 +261,7 @@ if st.button("🔍 Check Files"):
         try:
             st.write("✅ File uploaded successfully!")
             exams_timetabled = file_reading(uploaded_file, days, slots)
-            file_checking(exams_timetabled, Fixed_modules, Core_modules, student_exams, leader_courses, extra_time_students_50, exams, AEA,exam_counts)
+            file_checking(exams_timetabled, Fixed_modules, Core_modules, data.student_classes(), leader_courses, exams, exam_counts)
         except Exception as e:
             st.error(f"Error reading file: {e}") 
     else:
@@ -0,0 +1 @@
+# Helper modules shared by the Streamlit pages of the Exam Timetabling System
@@ -0,0 +1,154 @@
+# Bulk export of personal, room and module leader timetables as one ZIP
+import csv
+import hashlib
+import io
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timezone
+
+from openpyxl import Workbook
+
+SLOT_NAMES = ['Morning', 'Afternoon']
+# Start and end of the morning and afternoon sessions, used for the calendar events
+SLOT_TIMES = [(time(9, 30), time(12, 30)), (time(14, 0), time(17, 0))]
+EXPORT_FORMATS = {"csv": "CSV", "ics": "iCalendar", "xlsx": "Excel (rooms and module leaders)"}
+STUDENT_COLUMNS = ['Date', 'Day', 'Time', 'Exam', 'Room', 'Type']
+BOOKING_COLUMNS = STUDENT_COLUMNS + ['AEA students', 'Non-AEA students']
+# Timetables rendered per task, and tasks rendered ahead of the ZIP writer
+CHUNK_SIZE = 200
+WINDOW = 4
+
+
+def safe_name(name):
+    """File name part for a CID, room or leader: path separators and other odd characters become '_'."""
+    return re.sub(r"[^\w\-. ]+", "_", str(name)).strip(" .") or "_"
+
+
+def _ics_text(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_lines(*lines):
+    # Lines longer than 75 octets are folded onto continuation lines starting with a space
+    folded = []
+    for line in lines:
+        data = line.encode("utf-8")
+        while len(data) > 75:
+            cut = 75
+            while cut and (data[cut] & 0xC0) == 0x80:  # Don't split a UTF-8 character
+                cut -= 1
+            folded.append(data[:cut].decode("utf-8"))
+            data = b" " + data[cut:]
+        folded.append(data.decode("utf-8"))
+    return "".join(line + "\r\n" for line in folded)
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def exam_fragments(exams_timetabled, days, dates, exam_counts, exam_types):
+    """Render every scheduled exam once as its table row, CSV lines and calendar event.
+
+    Each timetable in the export is then a sorted join of these fragments, so the cost per student is
+    a few list lookups rather than formatting every exam again.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    fragments = {}
+    for exam, (d, s, room, *_) in exams_timetabled.items():
+        day = date.fromisoformat(dates[d])
+        start, end = (datetime.combine(day, t).strftime("%Y%m%dT%H%M%S") for t in SLOT_TIMES[s])
+        room_str = ', '.join(room)
+        counts = exam_counts.get(exam, [0, 0])
+        row = [dates[d], days[d], SLOT_NAMES[s], exam, room_str,
+               "Computer" if exam_types.get(exam) == "PC" else "Standard"]
+        booking_row = row + list(counts)
+        uid = hashlib.sha1(exam.encode("utf-8")).hexdigest()
+        fragments[exam] = {
+            "order": (d, s, exam),
+            "booking_row": booking_row,
+            "csv": _csv_line(row),
+            "booking_csv": _csv_line(booking_row),
+            "ics": _ics_lines(
+                "BEGIN:VEVENT", f"UID:{uid}@exam-timetable", f"DTSTAMP:{stamp}", f"DTSTART:{start}", f"DTEND:{end}",
+                f"SUMMARY:{_ics_text(exam)}", f"LOCATION:{_ics_text(room_str)}", "END:VEVENT",
+            ),
+        }
+    return fragments
+
+
+def _calendar(name, events):
+    return (_ics_lines("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Exam Timetabling//EN", "CALSCALE:GREGORIAN",
+                       f"X-WR-CALNAME:{_ics_text(name)}")
+            + "".join(events) + _ics_lines("END:VCALENDAR"))
+
+
+def _workbook(rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(BOOKING_COLUMNS)
+    for row in rows:
+        ws.append(row)
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def _render(group, timetables, fragments, formats):
+    # [(path in the ZIP, bytes)] for a chunk of (owner, exams) timetables of one group
+    files = []
+    booking = group != "students"
+    for owner, exams in timetables:
+        scheduled = sorted((fragments[exam] for exam in exams if exam in fragments), key=lambda f: f["order"])
+        path = f"{group}/{safe_name(owner)}"
+        if "csv" in formats:
+            columns, key = (BOOKING_COLUMNS, "booking_csv") if booking else (STUDENT_COLUMNS, "csv")
+            text = _csv_line(columns) + "".join(f[key] for f in scheduled)
+            files.append((f"{path}.csv", text.encode("utf-8")))
+        if "ics" in formats:
+            files.append((f"{path}.ics", _calendar(f"Exams: {owner}", [f["ics"] for f in scheduled]).encode("utf-8")))
+        if "xlsx" in formats and booking:
+            files.append((f"{path}.xlsx", _workbook(f["booking_row"] for f in scheduled)))
+    return files
+
+
+def bulk_export(exams_timetabled, days, dates, exam_counts, exam_types, student_exams, rooms, leader_courses,
+                formats=("csv", "ics"), workers=None):
+    """ZIP with a timetable per student (students/<CID>), room (rooms/) and module leader (leaders/).
+
+    formats picks from EXPORT_FORMATS; Excel files are only written for rooms and leaders, as one workbook
+    per student would make the export take minutes. Timetables are rendered in chunks on a thread pool while
+    the ZIP is written, with only a few chunks held at a time. The ZIP is written to a temporary file, which
+    is returned open at the start. Streamlit's download_button can't stream a file, so the page still reads
+    the finished archive into memory to serve it.
+    """
+    fragments = exam_fragments(exams_timetabled, days, dates, exam_counts, exam_types)
+    room_exams = {room: [] for room in rooms}
+    for exam, (_, _, assigned, *_) in exams_timetabled.items():
+        for room in assigned:
+            room_exams.setdefault(room, []).append(exam)
+
+    tasks = []
+    for group, timetables in (("students", list(student_exams.items())), ("rooms", list(room_exams.items())),
+                              ("leaders", list(leader_courses.items()))):
+        for i in range(0, len(timetables), CHUNK_SIZE):
+            tasks.append((group, timetables[i:i + CHUNK_SIZE]))
+
+    output = tempfile.TemporaryFile()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive, ThreadPoolExecutor(workers) as pool:
+        pending = deque()
+        for group, chunk in tasks:
+            pending.append(pool.submit(_render, group, chunk, fragments, formats))
+            if len(pending) >= WINDOW:
+                for name, data in pending.popleft().result():
+                    archive.writestr(name, data)
+        while pending:
+            for name, data in pending.popleft().result():
+                archive.writestr(name, data)
+    output.seek(0)
+    return output
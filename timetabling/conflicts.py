@@ -0,0 +1,55 @@
+# Exam-conflict graph built from the students' exam selections
+from collections import defaultdict
+
+
+def build_conflict_graph(student_exams):
+    """Return {(exam1, exam2): number of students taking both} for every conflicting exam pair."""
+    graph = defaultdict(int)
+    # Count each distinct exam selection once and weight it by how many students share it
+    selections = defaultdict(int)
+    for exs in student_exams.values():
+        selections[tuple(sorted(set(exs)))] += 1
+    for exs, n_students in selections.items():
+        for i in range(len(exs)):
+            for j in range(i + 1, len(exs)):
+                graph[(exs[i], exs[j])] += n_students
+    return dict(graph)
+
+
+def exam_adjacency(conflict_graph):
+    """{exam: set of exams it clashes with} from build_conflict_graph's pairs."""
+    neighbours = defaultdict(set)
+    for exam1, exam2 in conflict_graph:
+        neighbours[exam1].add(exam2)
+        neighbours[exam2].add(exam1)
+    return neighbours
+
+
+def exam_cliques(conflict_graph):
+    """Return a list of exam cliques covering every edge of the conflict graph.
+
+    Greedy cover over the exam adjacency: each clique starts from a pair not covered yet and is grown
+    with exams clashing with all of it, preferring those that cover the most uncovered pairs. The work
+    depends on the exams and their clashes only, not on the number of students.
+    """
+    neighbours = exam_adjacency(conflict_graph)
+    uncovered = {exam: set(adjacent) for exam, adjacent in neighbours.items()}
+    cliques = []
+    # Sorted tie-breaks keep the cover, and so the model, the same from run to run
+    for exam in sorted(neighbours, key=lambda e: (-len(neighbours[e]), e)):
+        while uncovered[exam]:
+            other = max(uncovered[exam], key=lambda e: (len(uncovered[e]), e))
+            members = {exam, other}
+            candidates = neighbours[exam] & neighbours[other]
+            # Uncovered pairs each candidate would add, kept up to date as members join
+            gain = {e: (e in uncovered[exam]) + (e in uncovered[other]) for e in candidates}
+            while candidates:
+                best = max(candidates, key=lambda e: (gain[e], e))
+                members.add(best)
+                candidates &= neighbours[best]
+                for e in candidates & uncovered[best]:
+                    gain[e] += 1
+            for member in members:
+                uncovered[member] -= members
+            cliques.append(sorted(members))
+    return cliques
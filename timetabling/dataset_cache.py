@@ -0,0 +1,113 @@
+# Cache of parsed input datasets keyed by the content of the uploaded workbooks
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from timetabling.student_list import StudentList
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # On-disk snapshots are optional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parsed dataset changes shape, so older snapshots on disk are not picked up
+DATASET_VERSION = 3
+
+
+def file_bytes(file):
+    """Content of an uploaded file or a path."""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    with open(file, "rb") as f:
+        return f.read()
+
+
+def dataset_key(*contents):
+    """sha256 over the raw bytes of every input file, in order, and the dataset version."""
+    digest = hashlib.sha256(f"dataset-v{DATASET_VERSION}".encode("utf-8"))
+    for content in contents:
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+def _to_table(dataset):
+    # Students as rows (exam IDs as a list column), everything else as JSON in the schema metadata
+    students = dataset["students"]
+    exams = pa.ListArray.from_arrays(pa.array(students.indptr, pa.int32()), pa.array(students.indices, pa.int32()))
+    meta = {key: value for key, value in dataset.items() if key != "students"}
+    meta["cids"] = students.cids
+    return pa.table(
+        {"exams": exams, "aea": students.aea, "extra_time_25": students.extra_time_25, "extra_time_50": students.extra_time_50},
+        metadata={"dataset": json.dumps(meta, default=str)},
+    )
+
+
+def _from_table(table):
+    meta = json.loads(table.schema.metadata[b"dataset"])
+    exams = table.column("exams").combine_chunks()
+    students = StudentList(
+        meta["exams"], meta.pop("cids"),
+        exams.offsets.to_numpy().astype(np.int64), exams.values.to_numpy().astype(np.int32),
+        table.column("aea").to_numpy(), table.column("extra_time_25").to_numpy(), table.column("extra_time_50").to_numpy(),
+        [],
+    )
+    meta["students"] = students
+    return meta
+
+
+class DatasetCache:
+    """LRU cache of parsed datasets bounded by their total pickled size, optionally snapshotted to disk.
+
+    A dataset is a dict holding a StudentList under "students" and JSON-friendly values otherwise.
+    Snapshots are Arrow (Feather) files and need pyarrow; without it the cache is in-memory only.
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # Shared by every session
+        self.lock = threading.Lock()
+        if directory and pa is None:
+            logger.warning("pyarrow is not installed, parsed datasets are only cached in memory")
+            self.directory = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries and self.directory and os.path.exists(self._path(key)):
+                self._remember(key, _from_table(feather.read_table(self._path(key))))
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def put(self, key, dataset):
+        with self.lock:
+            self._remember(key, dataset)
+            if self.directory:
+                feather.write_feather(_to_table(dataset), self._path(key))
+
+    def _remember(self, key, dataset):
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        size = len(pickle.dumps(dataset, pickle.HIGHEST_PROTOCOL))
+        self.entries[key] = (dataset, size)
+        self.total_bytes += size
+        # Always keep the newest entry, even if it is bigger than the bound on its own
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self.total_bytes -= self.entries.popitem(last=False)[1][1]
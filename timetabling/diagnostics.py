@@ -0,0 +1,88 @@
+# Model size, build time and solver statistics per constraint family, for the "Model diagnostics" panel
+import json
+import time
+
+from ortools.sat.python import cp_model
+
+
+class BuildStats:
+    """Records what each constraint or penalty family adds to a model while it is built.
+
+    Call family(name) before each block of build code; the block runs until the next family() or
+    finish(). Each entry holds the wall time and the variables, constraints and enforcement literals
+    the block added.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.families = []
+        self._current = None
+
+    def family(self, name):
+        self.finish()
+        proto = self.model.Proto()
+        self._current = (name, time.perf_counter(), len(proto.variables), len(proto.constraints))
+
+    def finish(self):
+        if self._current is None:
+            return
+        name, start, num_vars, num_constraints = self._current
+        self._current = None
+        proto = self.model.Proto()
+        constraints = proto.constraints
+        self.families.append({
+            "family": name,
+            "build_time": time.perf_counter() - start,
+            "variables": len(proto.variables) - num_vars,
+            "constraints": len(constraints) - num_constraints,
+            "enforcement_literals": sum(
+                len(constraints[i].enforcement_literal) for i in range(num_constraints, len(constraints))
+            ),
+        })
+
+
+def presolve_summary(log_lines):
+    """Pick the presolve summary and presolved model size out of a CP-SAT search log."""
+    summary = []
+    started = False
+    presolved_model = False
+    for line in log_lines:
+        if line.startswith("Presolve summary"):
+            started = True
+        if not started:
+            continue
+        if line.startswith("Presolved"):
+            presolved_model = True
+        if not line.strip():
+            if presolved_model:
+                break  # The presolved model's size lines end with a blank line
+            continue
+        summary.append(line)
+    return summary
+
+
+def diagnostics_json(diagnostics):
+    """Diagnostics dict as indented JSON bytes for the download button."""
+    return json.dumps(diagnostics, indent=2, default=str).encode("utf-8")
+
+
+def solve_diagnostics(model, solver, status, build_stats, cached, penalties, log_lines):
+    """Collect the diagnostics of a finished solve into a JSON-friendly dict.
+
+    penalties maps a family name to (terms, weight) as in SolveProgress.track; contributions are only
+    filled in when the solve found a solution.
+    """
+    proto = model.Proto()
+    solved = status in (cp_model.FEASIBLE, cp_model.OPTIMAL)
+    return {
+        "status": solver.StatusName(status),
+        "cached_model": cached,
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "families": build_stats,
+        "objective_contributions": {
+            name: weight * sum(solver.Value(term) for term in terms) for name, (terms, weight) in penalties.items()
+        } if solved else {},
+        "response_stats": solver.ResponseStats(),
+        "presolve": presolve_summary(log_lines),
+    }
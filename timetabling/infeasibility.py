@@ -0,0 +1,104 @@
+# Explaining infeasible timetables: hard constraints are guarded by assumption literals and the solver
+# reports which guards can't hold together
+import time
+
+from ortools.sat.python import cp_model
+
+
+class ConstraintGuards:
+    """Hands out enforcement literals for hard-constraint items when an explanation is wanted.
+
+    When disabled, guard() returns no literals so the constraints are added unconditionally.
+    """
+
+    def __init__(self, model, enabled=False):
+        self.model = model
+        self.enabled = enabled
+        self.items = []
+
+    def __call__(self, family, detail):
+        """Return the enforcement literals for one item of a family, e.g. ("Fixed modules", exam)."""
+        if not self.enabled:
+            return []
+        literal = self.model.NewBoolVar(f'guard_{len(self.items)}')
+        self.items.append((literal, family, detail))
+        return [literal]
+
+
+# Seconds allowed for the whole explanation, separate from the solver preset's time limit
+EXPLAIN_TIME_LIMIT = 30
+
+
+def explain_infeasibility(model, guards, time_limit=EXPLAIN_TIME_LIMIT, progress=None):
+    """Solve with every guard assumed true and shrink the conflicting set, family by family.
+
+    guards is the list of (literal, family, detail) from ConstraintGuards.items. Returns
+    (status, conflicts) where conflicts is a list of (family, [details], [undecided]) with one entry per
+    family that takes part. undecided holds the details that were still in question when the time ran out
+    or the run was stopped; they are kept in the conflict but may not be needed for it. An INFEASIBLE
+    status with no conflicts means the clash is in the constraints that are never guarded. Each solver is
+    registered with progress, if given, so a stop from the UI ends the explanation too.
+    """
+    deadline = time.time() + time_limit
+    family_of = {literal.Index(): (family, detail) for literal, family, detail in guards}
+    assumptions = [literal for literal, _, _ in guards]
+
+    def stopped():
+        return time.time() >= deadline or (progress is not None and progress.stop_requested)
+
+    def solve(literals):
+        # Every solve shares what is left of the one budget
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(0.1, deadline - time.time())
+        solver.parameters.num_workers = 1  # The infeasible core is reported by the sequential search
+        if progress is not None:
+            progress.track(solver, {}, "Explaining infeasibility")
+            if progress.stop_requested:
+                return cp_model.UNKNOWN, []
+        model.ClearAssumptions()
+        model.AddAssumptions(literals)
+        status = solver.Solve(model)
+        core = solver.SufficientAssumptionsForInfeasibility() if status == cp_model.INFEASIBLE else []
+        return status, core
+
+    status, core = solve(assumptions)
+    if status != cp_model.INFEASIBLE:
+        model.ClearAssumptions()
+        return status, []
+
+    # The core is sufficient but not always minimal: re-solve on it until it stops shrinking, then try
+    # dropping whole families, then single items. An item whose drop isn't decided before the budget runs
+    # out is kept and reported as undecided
+    core = [literal for literal in assumptions if literal.Index() in set(core)]
+    while not stopped():
+        sub_status, sub_core = solve(core)
+        if sub_status != cp_model.INFEASIBLE or len(sub_core) >= len(core):
+            break
+        core = [literal for literal in core if literal.Index() in set(sub_core)]
+    for family in dict.fromkeys(family_of[literal.Index()][0] for literal in core):
+        if stopped():
+            break
+        rest = [literal for literal in core if family_of[literal.Index()][0] != family]
+        if rest and solve(rest)[0] == cp_model.INFEASIBLE:
+            core = rest
+    undecided = set()
+    for literal in list(core):
+        if stopped():
+            undecided.add(literal.Index())
+            continue
+        rest = [other for other in core if other.Index() != literal.Index()]
+        sub_status = solve(rest)[0]
+        if sub_status == cp_model.INFEASIBLE:
+            core = rest
+        elif sub_status not in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+            undecided.add(literal.Index())
+    model.ClearAssumptions()
+
+    conflicts = {}
+    for literal in core:
+        family, detail = family_of[literal.Index()]
+        details, unsure = conflicts.setdefault(family, ([], []))
+        details.append(detail)
+        if literal.Index() in undecided:
+            unsure.append(detail)
+    return status, [(family, details, unsure) for family, (details, unsure) in conflicts.items()]
@@ -0,0 +1,121 @@
+# Streaming ingestion of the three input workbooks, reading only the sheets and columns the generator uses
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import python_calamine  # noqa: F401  Rust reader, used through pandas' calamine engine when installed
+    CALAMINE = True
+except ImportError:
+    CALAMINE = False
+
+# Student list columns kept: A (CID), D (AEA) and J onwards (one per exam); the rest are left empty
+STUDENT_COLUMNS = (0, 3)
+FIRST_EXAM_COLUMN = 9
+MODULE_COLUMNS = ['Banner Code (New CR)', 'Module Name', 'Module Leader (lecturer 1)',
+                  '(UGO Internal) 2nd Exam Marker', '(UGO Internal) Exam Style']
+
+
+def _rows(content, sheet_index=None, **kwargs):
+    # Values only from a read-only workbook, so openpyxl never builds cell objects. No sheet_index reads the active sheet
+    wb = load_workbook(BytesIO(content), read_only=True, data_only=True)
+    try:
+        ws = wb.active if sheet_index is None else wb.worksheets[sheet_index]
+        for row in ws.iter_rows(values_only=True, **kwargs):
+            yield row
+    finally:
+        wb.close()
+
+
+def _trim(rows):
+    # Trailing empty rows are dropped like pd.read_excel does
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+    return rows
+
+
+def read_student_list(content):
+    """Student list as a DataFrame with pd.read_excel(header=None)'s positional layout.
+
+    Only columns A, D and J onwards are kept, the columns in between are left empty. The calamine reader
+    skips the other columns through usecols; openpyxl parses every cell of a row whatever the column range,
+    so its single pass just doesn't keep them.
+    """
+    if CALAMINE:
+        df = pd.read_excel(BytesIO(content), header=None, engine="calamine",
+                           usecols=lambda column: column in STUDENT_COLUMNS or column >= FIRST_EXAM_COLUMN)
+        # Back to the positional layout, with the skipped columns empty
+        last = int(df.columns.max()) + 1 if len(df.columns) else 0
+        return df.reindex(columns=range(max(FIRST_EXAM_COLUMN, last)))
+    rows = []
+    for row in _rows(content, 0):
+        if len(row) < FIRST_EXAM_COLUMN:
+            row = row + (None,) * (FIRST_EXAM_COLUMN - len(row))
+        cid = row[0]
+        # Whole numbers come back as float from some exports, pandas reads them as int
+        if isinstance(cid, float) and cid.is_integer():
+            cid = int(cid)
+        rows.append((cid, None, None, row[3]) + (None,) * (FIRST_EXAM_COLUMN - 4) + row[FIRST_EXAM_COLUMN:])
+    return pd.DataFrame(_trim(rows), dtype=object)
+
+
+def read_module_list(content):
+    """Second sheet of the module list with the header on row 2, keeping only the columns the generator reads."""
+    if CALAMINE:
+        return pd.read_excel(BytesIO(content), sheet_name=1, header=1, engine="calamine",
+                             usecols=lambda column: column in MODULE_COLUMNS)
+    rows = _rows(content, 1, min_row=2)
+    header = next(rows, ())
+    # First column with each wanted name, as pd.read_excel would keep it unrenamed
+    positions = {}
+    for i, name in enumerate(header):
+        if name in MODULE_COLUMNS and name not in positions:
+            positions[name] = i
+    data = [tuple(row[i] if i < len(row) else None for i in positions.values()) for row in rows]
+    return pd.DataFrame(_trim(data), columns=list(positions), dtype=object)
+
+
+def read_useful_dates(content):
+    """Read columns F and G of the active useful dates sheet in one pass and pick out what the generator needs.
+
+    Returns {"bank_holidays": [(name, datetime)], "summer_term": text of the row under 'Summer Term' or None,
+    "errors": [...]}. Bank holidays are listed from F5 down to the first empty cell or 'Term Dates' row,
+    and 'Summer Term' is looked for from there on.
+    """
+    # cells[r] is (F, G) of sheet row r + 1
+    cells = _trim([row + (None,) * (2 - len(row)) for row in _rows(content, min_col=6, max_col=7)])
+    max_row = len(cells)
+
+    def cell(row):
+        return cells[row - 1] if row <= max_row else (None, None)
+
+    errors = []
+    bank_holidays = []
+    found_bank_holidays = False
+    row = 5
+    while True:
+        name, date = cell(row)
+        if name is None or "Term Dates" in str(name):
+            break
+        if "Bank Holiday" in str(name):
+            found_bank_holidays = True
+        if isinstance(date, datetime):
+            bank_holidays.append((str(name).strip(), date))
+        row += 1
+    if not found_bank_holidays:
+        errors.append("Could not find bank holidays section in useful dates file")
+
+    summer_term = None
+    found_summer_term = False
+    while row < max_row:
+        name = cell(row)[0]
+        if name and "Summer Term" in str(name):
+            found_summer_term = True
+            summer_term = cell(row + 1)[0]
+            break
+        row += 1
+    if not found_summer_term:
+        errors.append("Could not find Summer Term section in useful dates file")
+    return {"bank_holidays": bank_holidays, "summer_term": summer_term, "errors": errors}
@@ -0,0 +1,77 @@
+# Persistent module-to-exam matches, so later runs only match new or changed module list rows
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Set to a JSON file path to keep the store elsewhere, e.g. on a shared drive
+MATCH_STORE_ENV_VAR = "TIMETABLE_MATCH_STORE"
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".exam_timetabling", "module_matches.json")
+
+
+def module_key(code, name):
+    """Banner code plus the module name lowercased with punctuation and repeated spaces removed."""
+    normalised = re.sub(r"[^a-z0-9]+", " ", str(name).lower()).strip()
+    return f"{str(code).strip().upper()}|{normalised}"
+
+
+class MatchStore:
+    """JSON file of {module key: {"exam": exam name or None, "source": "confirmed" or "override"}}.
+
+    Confirmed entries are unambiguous matches remembered from earlier runs; overrides are set by hand
+    on the page and are never replaced by a match. An override with exam None keeps the module unmatched.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(MATCH_STORE_ENV_VAR) or DEFAULT_PATH
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def known(self):
+        """Copy of the store as {module key: (exam, source)}."""
+        with self.lock:
+            return {key: (entry["exam"], entry["source"]) for key, entry in self.entries.items()}
+
+    def fingerprint(self):
+        """Hash of the overrides, so datasets matched with them can be cached against it.
+
+        Confirmed entries are left out as they only repeat what matching finds anyway.
+        """
+        with self.lock:
+            overrides = {key: entry for key, entry in self.entries.items() if entry["source"] == "override"}
+        return hashlib.sha256(json.dumps(overrides, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def remember(self, matches):
+        """Store the unambiguous code and fuzzy matches of a match table (see match_modules)."""
+        with self.lock:
+            changed = False
+            for match in matches:
+                if match["Method"] not in ("Banner code", "Fuzzy") or match["Ambiguous with"]:
+                    continue
+                entry = self.entries.get(match["Key"])
+                if entry is not None and (entry["source"] == "override" or entry["exam"] == match["Exam"]):
+                    continue
+                self.entries[match["Key"]] = {"exam": match["Exam"], "source": "confirmed"}
+                changed = True
+            if changed:
+                self._save()
+
+    def override(self, overrides):
+        """Set {module key: exam or None} by hand."""
+        with self.lock:
+            for key, exam in overrides.items():
+                self.entries[key] = {"exam": exam, "source": "override"}
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,76 @@
+# Matching module list rows to the exam columns of the student list
+import re
+from collections import defaultdict
+
+from rapidfuzz import process, fuzz
+
+from timetabling.match_store import module_key
+
+# Banner codes such as MECH70001 or ELEC70098 (in "ME-ELEC70098"); an exam name can hold several
+BANNER_CODE = re.compile(r"[A-Z]{3,5}\d{5}")
+MIN_SCORE = 70
+# A runner-up within this many points of the best fuzzy score is reported as ambiguous
+AMBIGUITY_MARGIN = 5
+
+
+def banner_codes(text):
+    return BANNER_CODE.findall(str(text).upper())
+
+
+def match_modules(modules, exams, known=None, min_score=MIN_SCORE):
+    """Match each (code, name) module to an exam name.
+
+    known maps module keys to (exam, source) from a MatchStore: a stored exam that is still in exams is
+    used as it is, as is an override to leave the module unmatched. Otherwise a module whose Banner code
+    appears in exactly one exam name is matched on the code. Modules whose code appears in several exam
+    names are scored against those exams only. The rest are scored against every exam with
+    token_sort_ratio in one cdist call on all cores, keeping the best exam if it scores at least min_score. Returns one row per module: {"Module", "Exam" (None when unmatched), "Score", "Method",
+    "Ambiguous with", "Key"}.
+    """
+    known = known or {}
+    exam_set = set(exams)
+    code_index = defaultdict(list)
+    for exam in exams:
+        for code in banner_codes(exam):
+            if exam not in code_index[code]:
+                code_index[code].append(exam)
+
+    matches = []
+    unresolved = []
+    for code, name in modules:
+        combined_name = f"{code} {name}"
+        candidates = []
+        for module_code in banner_codes(code):
+            candidates += [exam for exam in code_index.get(module_code, []) if exam not in candidates]
+        key = module_key(code, name)
+        row = {"Module": combined_name, "Exam": None, "Score": None, "Method": None, "Ambiguous with": "", "Key": key}
+        stored_exam, source = known.get(key, (None, None))
+        if stored_exam in exam_set or (source == "override" and stored_exam is None):
+            row.update({"Exam": stored_exam, "Method": "Override" if source == "override" else "Stored match"})
+        elif len(candidates) == 1:
+            row.update({"Exam": candidates[0], "Score": 100.0, "Method": "Banner code"})
+        elif candidates:
+            best, score, _ = process.extractOne(combined_name, candidates, scorer=fuzz.token_sort_ratio)
+            others = [exam for exam in candidates if exam != best]
+            row.update({"Exam": best, "Score": float(score), "Method": "Banner code, closest name",
+                        "Ambiguous with": "; ".join(others)})
+        else:
+            unresolved.append(len(matches))
+        matches.append(row)
+
+    if unresolved and exams:
+        scores = process.cdist([matches[i]["Module"] for i in unresolved], exams, scorer=fuzz.token_sort_ratio, workers=-1)
+        for i, row_scores in zip(unresolved, scores):
+            best = int(row_scores.argmax())
+            score = float(row_scores[best])
+            row = matches[i]
+            row["Score"] = score
+            if score < min_score:
+                row["Method"] = "No match"
+                continue
+            close = [exams[j] for j in (row_scores >= score - AMBIGUITY_MARGIN).nonzero()[0] if j != best]
+            row.update({"Exam": exams[best], "Method": "Fuzzy", "Ambiguous with": "; ".join(close)})
+    for i in unresolved:
+        if matches[i]["Method"] is None:
+            matches[i]["Method"] = "No match"
+    return matches
@@ -0,0 +1,103 @@
+# Cache of built CP-SAT models so unchanged inputs skip the Python model build
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from ortools.sat.python import cp_model
+from ortools.sat.python import cp_model_helper
+
+
+def model_cache_key(*parts):
+    """Content hash of everything the constraint set depends on (data, room/fixed config, hard parameters)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _to_indices(obj):
+    # Replace variables and linear expressions by proto indices so handles survive cloning and pickling
+    if isinstance(obj, cp_model.IntVar):
+        return ("var", obj.index)
+    if isinstance(obj, cp_model.LinearExpr):
+        flat = cp_model_helper.FlatIntExpr(obj)
+        return ("expr", [(var.index, coeff) for var, coeff in zip(flat.vars, flat.coeffs)], flat.offset)
+    if isinstance(obj, dict):
+        return {key: _to_indices(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_to_indices(value) for value in obj]
+    return obj
+
+
+def _from_indices(model, obj):
+    if isinstance(obj, tuple) and obj and obj[0] == "var":
+        return model.GetIntVarFromProtoIndex(obj[1])
+    if isinstance(obj, tuple) and obj and obj[0] == "expr":
+        return sum(coeff * model.GetIntVarFromProtoIndex(index) for index, coeff in obj[1]) + obj[2]
+    if isinstance(obj, dict):
+        return {key: _from_indices(model, value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_from_indices(model, value) for value in obj]
+    return obj
+
+
+class ModelCache:
+    """LRU cache of built models without an objective, optionally mirrored to a directory on disk.
+
+    Entries are (model, handles) where handles is any nesting of dicts/lists holding the model's
+    variables and linear expressions. get() always returns a fresh clone, so callers are free to add
+    hints, constraints and an objective.
+    """
+
+    def __init__(self, max_entries=4, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        # Shared by every session's solver thread
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        return os.path.join(self.directory, f"{key}.pb.txt"), os.path.join(self.directory, f"{key}.handles.pkl")
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def put(self, key, model, handles):
+        with self.lock:
+            self._put(key, model, handles)
+
+    def _get(self, key):
+        if key not in self.entries and self.directory:
+            model_path, handles_path = self._paths(key)
+            if os.path.exists(model_path) and os.path.exists(handles_path):
+                model = cp_model.CpModel()
+                with open(model_path, encoding="utf-8") as f:
+                    model.Proto().parse_text_format(f.read())
+                with open(handles_path, "rb") as f:
+                    self._remember(key, model, pickle.load(f))
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        model, handles = self.entries[key]
+        clone = model.Clone()
+        return clone, _from_indices(clone, handles)
+
+    def _put(self, key, model, handles):
+        model = model.Clone()
+        handles = _to_indices(handles)
+        self._remember(key, model, handles)
+        if self.directory:
+            model_path, handles_path = self._paths(key)
+            model.ExportToFile(model_path)
+            with open(handles_path, "wb") as f:
+                pickle.dump(handles, f)
+
+    def _remember(self, key, model, handles):
+        self.entries[key] = (model, handles)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -0,0 +1,140 @@
+# Cheap feasibility screening run before the model is built, so hopeless inputs fail in milliseconds
+from collections import defaultdict
+
+from timetabling.rooms import NA_ROOM
+from timetabling.students import describe_students
+
+
+def core_fixed_clashes(student_exams, core_modules, fixed_modules):
+    """Return (student, core exam, fixed exam) for students with a core module on the same day as another fixed module."""
+    fixed_days = {exam: day for exam, (day, slot) in fixed_modules.items()}
+    clashes = []
+    for student, exs in student_exams.items():
+        fixed_taken = [exam for exam in exs if exam in fixed_days]
+        for exam in fixed_taken:
+            if exam not in core_modules:
+                continue
+            for other_exam in fixed_taken:
+                if other_exam != exam and fixed_days[other_exam] == fixed_days[exam]:
+                    clashes.append((student, exam, other_exam))
+    return clashes
+
+
+def max_exams_in_days(open_slots, window_limits, one_per_day=False):
+    """Upper bound on how many exams one student can sit.
+
+    open_slots is the number of open slots on each day and window_limits a list of (window, max_exams).
+    Each bound below is valid on its own, so the smallest is returned.
+    """
+    num_days = len(open_slots)
+    bounds = [sum(min(n, 1) if one_per_day else n for n in open_slots)]
+    for window, max_exams in window_limits:
+        if num_days < window:
+            continue  # No full window, so the limit is never applied
+        # Disjoint windows tile the exam period, each holding at most max_exams
+        bounds.append(-(-num_days // window) * max_exams)
+    return min(bounds)
+
+
+def largest_clique(cliques):
+    """Largest clique of the exam-conflict graph's clique cover, a lower bound on the periods needed.
+
+    Each clique of exam_cliques is grown greedily over the exam adjacency until no exam clashes with all
+    of it, so this is a large clique found in at most exams² steps rather than a maximum one.
+    """
+    return max(cliques, key=len, default=[])
+
+
+def preflight_checks(exams, num_days, slots, no_exam_dates, cliques, student_classes, exam_counts, exam_types,
+                     leader_courses, rooms, fixed_modules, core_modules, max_exams_2days, max_exams_5days, pinned=None):
+    """Screen the parsed inputs with combinatorial bounds before solving.
+
+    Returns (errors, warnings). Any error means the model is certainly infeasible; warnings point at
+    inputs that are tight and may make the solve slow or infeasible. cliques is the clique cover of the
+    exam-conflict graph (see exam_cliques).
+    """
+    errors = []
+    warnings = []
+    pinned = pinned or {}
+    fixed = {exam: tuple(value) for exam, value in fixed_modules.items() if exam in exams and exam not in pinned}
+    closed = {tuple(date) for date in no_exam_dates}
+    open_slots = [sum(1 for slot in slots if (day, slot) not in closed) for day in range(num_days)]
+    periods = sum(open_slots)
+
+    # Periods: every student's exams, and every clique of clashing exams, need distinct periods
+    clique = largest_clique(cliques)
+    if len(clique) > periods:
+        errors.append(f"{len(clique)} exams clash pairwise ({', '.join(clique)}) but only {periods} exam periods are available")
+    elif len(clique) > 0.8 * periods:
+        warnings.append(f"{len(clique)} exams clash pairwise for only {periods} exam periods, the solve may be slow")
+    for exam, (day, slot) in fixed.items():
+        if (day, slot) in closed or not 0 <= day < num_days:
+            errors.append(f"Fixed module {exam} is on a date with no exams")
+
+    # Students: window limits and fixed exams
+    window_limits = [(2, max_exams_2days), (5, max_exams_5days)]
+    for student_group in student_classes:
+        exs = student_group["exams"]
+        label = describe_students(student_group["cids"])
+        one_per_day = student_group["category"] == "50% extra time"
+        limit = max_exams_in_days(open_slots, window_limits, one_per_day)
+        if len(exs) > limit:
+            errors.append(f"{label}: {len(exs)} exams but at most {limit} fit the exam window limits")
+        fixed_taken = [exam for exam in exs if exam in fixed]
+        by_period = defaultdict(list)
+        by_day = defaultdict(list)
+        for exam in fixed_taken:
+            by_period[fixed[exam]].append(exam)
+            by_day[fixed[exam][0]].append(exam)
+        for period_exams in by_period.values():
+            if len(period_exams) > 1:
+                errors.append(f"{label}: fixed modules {', '.join(period_exams)} are at the same time")
+        for day, day_exams in by_day.items():
+            if len(day_exams) > 1 and (one_per_day or any(exam in core_modules for exam in day_exams)):
+                errors.append(f"{label}: fixed modules {', '.join(day_exams)} are on the same day")
+        for window, max_exams in window_limits:
+            for start_day in range(num_days - window + 1):
+                in_window = [exam for exam in fixed_taken if start_day <= fixed[exam][0] < start_day + window]
+                if len(in_window) > max_exams:
+                    errors.append(f"{label}: fixed modules {', '.join(in_window)} exceed the {window}-day limit")
+                    break
+
+    # Rooms: every ME exam must fit the rooms it may use
+    physical_rooms = [room for room in rooms if room != NA_ROOM]
+    na_exams = {exam for exam in exams if exam in fixed_modules and exam not in core_modules}
+    for exam in exams:
+        if exam in na_exams or exam not in exam_counts:
+            continue
+        usable = [room for room in physical_rooms if exam_types[exam] != "PC" or "Computer" in rooms[room][0]]
+        for tag, idx in (("AEA", 0), ("SEQ", 1)):
+            capacity = sum(rooms[room][1] for room in usable if tag in rooms[room][0])
+            if exam_counts[exam][idx] > capacity:
+                kind = "computer rooms" if exam_types[exam] == "PC" else "rooms"
+                errors.append(f"{exam}: {exam_counts[exam][idx]} {tag} students but {tag} {kind} only seat {capacity}")
+    me_exams = [exam for exam in exams if exam not in na_exams]
+    if len(me_exams) > periods * len(physical_rooms):
+        errors.append(f"{len(me_exams)} exams need rooms but only {periods} periods x {len(physical_rooms)} rooms exist")
+
+    # Leaders: at most one exam in week 3 (days 13 to 20). Fixed exams there count as they are; of the
+    # leader's other exams, those clashing pairwise need distinct periods, and any beyond the periods
+    # outside week 3 are pushed into it
+    outside_week3 = sum(n for day, n in enumerate(open_slots) if not 13 <= day <= 20)
+    exam_cliques_of = defaultdict(list)
+    for i, members in enumerate(cliques):
+        for exam in members:
+            exam_cliques_of[exam].append(i)
+    for leader, leader_exams in leader_courses.items():
+        fixed_week3 = [exam for exam in leader_exams if exam in fixed and 13 <= fixed[exam][0] <= 20]
+        if len(fixed_week3) > 1:
+            errors.append(f"{leader}: fixed modules {', '.join(fixed_week3)} are all in week 3")
+            continue
+        clashing = defaultdict(list)
+        for exam in leader_exams:
+            if exam in exams and exam not in fixed and exam not in pinned:
+                for i in exam_cliques_of[exam]:
+                    clashing[i].append(exam)
+        largest = max(clashing.values(), key=len, default=[])
+        if len(fixed_week3) + len(largest) - outside_week3 > 1:
+            errors.append(f"{leader}: exams {', '.join(largest)} clash pairwise, so with only {outside_week3} exam "
+                          f"periods outside week 3 more than one of {leader}'s exams must be in week 3")
+    return errors, warnings
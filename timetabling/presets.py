@@ -0,0 +1,25 @@
+# Named CP-SAT solver presets, read from solver_presets.json
+import json
+import os
+
+PRESETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_presets.json")
+DEFAULT_PRESET = "Standard"
+
+# Preset keys copied straight onto solver.parameters
+SOLVER_PARAMETERS = ["max_time_in_seconds", "num_workers", "random_seed", "relative_gap_limit", "log_search_progress"]
+
+
+def load_presets(path=PRESETS_FILE):
+    """Return {preset name: settings} from the presets file."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def apply_preset(solver, preset):
+    """Set the solver parameters listed in SOLVER_PARAMETERS from a preset dict.
+
+    num_workers 0 lets CP-SAT use every core.
+    """
+    for key in SOLVER_PARAMETERS:
+        if key in preset:
+            setattr(solver.parameters, key, preset[key])
@@ -0,0 +1,128 @@
+# Opt-in cProfile and tracemalloc profiling of the phases of a timetable run
+import cProfile
+import marshal
+import os
+import pickle
+import re
+import threading
+import time
+import tracemalloc
+import zipfile
+from contextlib import contextmanager
+from io import BytesIO
+
+# Set to 1 to profile every run, e.g. in the frozen build started by launcher.py
+PROFILE_ENV_VAR = "TIMETABLE_PROFILE"
+
+# Enabled profilers that have not finished. tracemalloc is started for the first one and stopped after
+# the last, unless it was already tracing (e.g. PYTHONTRACEMALLOC), so other runs are not slowed down
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def profiling_requested(query_params=None):
+    """True when TIMETABLE_PROFILE is set or the page was opened with ?profile=1."""
+    if os.environ.get(PROFILE_ENV_VAR, "").strip().lower() in ("1", "true", "yes"):
+        return True
+    return query_params is not None and query_params.get("profile") == "1"
+
+
+class PhaseProfiler:
+    """Times each named phase and, when enabled, profiles it with cProfile and tracemalloc.
+
+    Phases with the same name accumulate into one entry. Phases may run on different threads but
+    must not be nested. When disabled, phase() does nothing. Call finish() when the run is over, which
+    packs the profiles and snapshots into the archive so the profiler is cheap to keep in session state.
+    """
+
+    def __init__(self, enabled=False):
+        global _tracing_users, _started_tracing
+        self.enabled = enabled
+        self.tracing = enabled
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.packed = None
+        if enabled:
+            with _tracing_lock:
+                if _tracing_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _started_tracing = True
+                _tracing_users += 1
+
+    def finish(self):
+        """Stop tracing memory if no other profiled run still needs it. Safe to call more than once."""
+        global _tracing_users, _started_tracing
+        with self.lock:
+            if not self.tracing:
+                return
+            self.tracing = False
+            self.packed = self._pack()
+            for entry in self.phases.values():
+                entry["profile"] = entry["snapshot"] = None
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled or not self.tracing:
+            yield
+            return
+        with self.lock:
+            entry = self.phases.setdefault(name, {
+                "calls": 0, "wall_time": 0.0, "cpu_time": 0.0, "peak_memory": 0, "profile": cProfile.Profile(),
+                "snapshot": None,
+            })
+        tracemalloc.reset_peak()
+        profile = entry["profile"]
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None  # Another profiler is active on this interpreter, keep the timings only
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            if profile is not None:
+                profile.disable()
+            peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot()
+            with self.lock:
+                entry["calls"] += 1
+                entry["wall_time"] += wall
+                entry["cpu_time"] += cpu
+                entry["peak_memory"] = max(entry["peak_memory"], peak)
+                entry["snapshot"] = snapshot
+
+    def summary(self):
+        """One row per phase in the order they first ran."""
+        with self.lock:
+            return [{
+                "Phase": name,
+                "Calls": entry["calls"],
+                "Wall time (s)": round(entry["wall_time"], 3),
+                "CPU time (s)": round(entry["cpu_time"], 3),
+                "Peak traced memory (MB)": round(entry["peak_memory"] / 2 ** 20, 1),
+            } for name, entry in self.phases.items()]
+
+    def archive(self):
+        """ZIP with a .prof file (readable by pstats/snakeviz) and a tracemalloc snapshot per phase."""
+        with self.lock:
+            return BytesIO(self.packed if self.packed is not None else self._pack())
+
+    def _pack(self):
+        output = BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+            for i, (name, entry) in enumerate(self.phases.items(), start=1):
+                stem = f"{i:02d}_{re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower()}"
+                profile = entry["profile"]
+                profile.create_stats()
+                zf.writestr(f"{stem}.prof", marshal.dumps(profile.stats))
+                if entry["snapshot"] is not None:
+                    # Same format as tracemalloc.Snapshot.dump, load with tracemalloc.Snapshot.load
+                    zf.writestr(f"{stem}.tracemalloc", pickle.dumps(entry["snapshot"], pickle.HIGHEST_PROTOCOL))
+        return output.getvalue()
@@ -0,0 +1,78 @@
+# Live progress reporting from CP-SAT while the timetable is being solved
+import threading
+
+from ortools.sat.python import cp_model
+
+
+class SolveProgress(cp_model.CpSolverSolutionCallback):
+    """Records every improving solution so the page can show it while the solver runs in another thread."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.solutions = []
+        self.phase = "Building model"
+        self.stop_requested = False
+        self.solver = None
+        self.penalties = {}
+        # (family, [details], [undecided details]) of conflicting hard constraints, set when the model is
+        # infeasible (see infeasibility.explain_infeasibility)
+        self.conflicts = None
+        # Why the solve ended without a timetable, when there is more to say than "no timetable"
+        self.failure = None
+        # Messages from the preflight checks run before the model is built
+        self.preflight_errors = []
+        self.preflight_warnings = []
+        # Model size, build times and solver statistics of the last solve (see diagnostics.solve_diagnostics)
+        self.diagnostics = None
+
+    def track(self, solver, penalties, phase):
+        """Attach the solver about to run and the penalty families to report.
+
+        penalties maps a family name to (terms, weight); its contribution is weight * sum of the terms.
+        """
+        with self.lock:
+            self.solver = solver
+            self.penalties = penalties
+            self.phase = phase
+
+    def on_solution_callback(self):
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        snapshot = {
+            "phase": self.phase,
+            "objective": objective,
+            "bound": bound,
+            "gap": abs(objective - bound) / max(1.0, abs(objective)),
+            "wall_time": self.WallTime(),
+            "penalties": {
+                name: weight * sum(self.Value(term) for term in terms)
+                for name, (terms, weight) in self.penalties.items()
+            },
+        }
+        with self.lock:
+            self.solutions.append(snapshot)
+        if self.stop_requested:
+            self.StopSearch()
+
+    def stop(self):
+        """Stop the search from the UI thread, the best solution found so far is kept."""
+        with self.lock:
+            self.stop_requested = True
+            solver = self.solver
+        if solver is not None:
+            solver.StopSearch()
+
+    def release(self):
+        """Drop the solver and the penalty terms once the solve is over.
+
+        A kept IntVar keeps the whole model proto alive, and the progress object lives on in session state.
+        """
+        with self.lock:
+            self.solver = None
+            self.penalties = {}
+
+    def latest(self):
+        """Return (phase, list of solution snapshots so far)."""
+        with self.lock:
+            return self.phase, list(self.solutions)
@@ -0,0 +1,74 @@
+# A solved timetable with everything the results page, the downloads and the checker read from it
+import logging
+import pickle
+
+from timetabling.schedule_io import timetable_table, write_timetable
+from timetabling.bulk_export import bulk_export
+from timetabling.students import group_students
+
+logger = logging.getLogger(__name__)
+
+# Pickled size a result is expected to stay under, as several officers' sessions share one server
+SESSION_BUDGET_BYTES = 16 * 2 ** 20
+
+
+class TimetableResult:
+    """Kept in session state as "exam_data" after a successful run.
+
+    schedule maps each exam to (day, slot, [rooms]); days are the day names and dates their ISO dates.
+    penalty is the solver's total penalty and objective its breakdown per penalty family. students is
+    the compacted StudentList (exam IDs in CSR arrays, boolean category masks, names held once), and the
+    leader, room and module fields are the other inputs the timetable was solved with, so the checker can
+    test the schedule (or an edited copy) against them.
+    """
+
+    def __init__(self, schedule, days, dates, slots, exams, exam_counts, exam_types, penalty, objective, hint_stats,
+                 students, leader_courses, rooms, fixed_modules, core_modules):
+        self.schedule = schedule
+        self.days = days
+        self.dates = dates
+        self.slots = slots
+        self.exams = exams
+        self.exam_counts = exam_counts
+        self.exam_types = exam_types
+        self.penalty = penalty
+        self.objective = objective
+        self.hint_stats = hint_stats
+        self.students = students
+        self.leader_courses = leader_courses
+        self.rooms = rooms
+        self.fixed_modules = fixed_modules
+        self.core_modules = core_modules
+
+    def student_exams(self):
+        """{CID: [exam names]}, built from the arrays when needed rather than kept."""
+        return self.students.student_exams()
+
+    def student_classes(self):
+        """Students grouped by exams and category (see group_students)."""
+        return group_students(self.student_exams(), self.students.aea_cids(), self.students.extra_time_25_cids(),
+                              self.students.extra_time_50_cids())[0]
+
+    def payload_bytes(self, *held_with):
+        """Pickled size of the result and whatever session state keeps alongside it (held_with), logged
+        against SESSION_BUDGET_BYTES. This serialises everything, so the page only calls it on profiled runs."""
+        size = len(pickle.dumps((self, *held_with), pickle.HIGHEST_PROTOCOL))
+        if size > SESSION_BUDGET_BYTES:
+            logger.warning(f"Timetable result takes {size / 2 ** 20:.1f} MB of session state, over the "
+                           f"{SESSION_BUDGET_BYTES / 2 ** 20:.0f} MB session budget")
+        return size
+
+    def table(self):
+        """The timetable sheet as a DataFrame, for display."""
+        return timetable_table(self.schedule, self.days, self.exam_counts, self.exam_types,
+                               self.fixed_modules, self.core_modules)
+
+    def excel(self):
+        """The styled timetable workbook in a BytesIO (see write_timetable)."""
+        return write_timetable(self.schedule, self.days, self.exam_counts, self.exam_types,
+                               self.fixed_modules, self.core_modules)
+
+    def bulk_export(self, formats):
+        """ZIP of timetables per student, room and module leader in a temporary file (see bulk_export)."""
+        return bulk_export(self.schedule, self.days, self.dates, self.exam_counts, self.exam_types,
+                           self.student_exams(), self.rooms, self.leader_courses, formats)
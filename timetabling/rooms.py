@@ -0,0 +1,195 @@
+# Room constraints shared by the full timetable model and the per-period room allocation models
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ortools.sat.python import cp_model
+
+NA_ROOM = 'NON ME N/A'
+
+
+def _no_guard(family, detail):
+    return []
+
+
+def add_room_constraints(model, exam_room, exams, exam_counts, exam_types, rooms, na_exams, guard=_no_guard):
+    """Add the per-exam room rules to model and return (room_surplus, non_pc_exam_penalty) penalty terms.
+
+    Room double-booking is not added here as it depends on how the periods are modelled. guard(family, detail)
+    returns the enforcement literals for the capacity and PC room rules (see infeasibility.ConstraintGuards).
+    """
+    # Ensure each non ME exam is assigned room N/A and ME is not assingned this
+    for exam in exams:
+        if exam in na_exams:
+            model.Add(exam_room[(exam, NA_ROOM)] == 1)  # Assign to N/A room if fixed module
+        else:
+            model.Add(exam_room[(exam, NA_ROOM)] == 0)  # Do not assign to N/A room if not fixed module
+
+    #Must have sufficient room for each exam
+    for exam in exams:
+        AEA_capacity = sum(
+            rooms[room][1] * exam_room[(exam, room)]
+            for room in rooms if "AEA" in rooms[room][0]
+        )
+        SEQ_capacity = sum(
+            rooms[room][1] * exam_room[(exam, room)]
+            for room in rooms if "SEQ" in rooms[room][0]
+        )
+        AEA_students = exam_counts[exam][0]
+        SEQ_students = exam_counts[exam][1]
+        enforce = guard("Room capacity", exam)
+        model.Add(AEA_capacity >= AEA_students).OnlyEnforceIf(enforce)
+        model.Add(SEQ_capacity >= SEQ_students).OnlyEnforceIf(enforce)
+
+    #Ensure non computer rooms not used for computer exams
+    for exam in exams:
+        if exam_types[exam] == "PC":
+            enforce = guard("PC rooms", exam)
+            for room in rooms:
+                uses = rooms[room][0]
+                if "Computer" not in uses:
+                    model.Add(exam_room[(exam, room)] == 0).OnlyEnforceIf(enforce)
+
+    # Minimize amount of rooms used
+    room_surplus = []
+    for exam in exams:
+        model.Add(sum(exam_room[(exam, room)] for room in rooms) >= 1)
+        rooms_len = model.NewIntVar(0, 9, f'rooms for {exam}')
+
+        model.Add(rooms_len == sum(exam_room[(exam, room)]for room in rooms))
+        rooms_penalty = model.NewIntVar(0, 15, f'{exam}_room_surplus_penalty')
+
+        is_room_length_greater_6 = model.NewBoolVar(f'{exam}_has_six_or_more_rooms')
+        is_room_length_5 = model.NewBoolVar(f'{exam}_has_five_rooms')
+        is_room_length_4 = model.NewBoolVar(f'{exam}_has_four_rooms')
+        is_room_length_3 = model.NewBoolVar(f'{exam}_has_three_rooms')
+
+        model.Add(rooms_len >= 6).OnlyEnforceIf(is_room_length_greater_6)
+        model.Add(rooms_len <= 5).OnlyEnforceIf(is_room_length_greater_6.Not())
+        model.Add(rooms_len == 5).OnlyEnforceIf(is_room_length_5)
+        model.Add(rooms_len != 5).OnlyEnforceIf(is_room_length_5.Not())
+        model.Add(rooms_len == 4).OnlyEnforceIf(is_room_length_4)
+        model.Add(rooms_len != 4).OnlyEnforceIf(is_room_length_4.Not())
+        model.Add(rooms_len == 3).OnlyEnforceIf(is_room_length_3)
+        model.Add(rooms_len != 3).OnlyEnforceIf(is_room_length_3.Not())
+
+        model.Add(rooms_penalty == 15).OnlyEnforceIf(is_room_length_greater_6)
+        model.Add(rooms_penalty == 9).OnlyEnforceIf(is_room_length_5)
+        model.Add(rooms_penalty == 6).OnlyEnforceIf(is_room_length_4)
+        model.Add(rooms_penalty == 4).OnlyEnforceIf(is_room_length_3)
+        model.Add(rooms_penalty == 0).OnlyEnforceIf(
+                    is_room_length_3.Not(), is_room_length_4.Not(), is_room_length_5.Not(), is_room_length_greater_6.Not(),
+                )
+        room_surplus.append(rooms_penalty)
+
+    #Penalise using pc rooms for non pc exams
+    non_pc_exam_penalty = []
+    computer_rooms = [room for room in rooms if "Computer" in rooms[room][0]]
+    for exam in exams:
+        if exam_types[exam] != "PC":
+            for room in computer_rooms:
+                penalty_var = model.NewBoolVar(f"non_pc_exam_in_pc_room_{exam}_{room}")
+                model.Add(exam_room[(exam, room)] == 1).OnlyEnforceIf(penalty_var)
+                model.Add(exam_room[(exam, room)] != 1).OnlyEnforceIf(penalty_var.Not())
+                non_pc_exam_penalty.append(5 * penalty_var)
+
+    return room_surplus, non_pc_exam_penalty
+
+
+def add_period_capacity_constraints(model, exams_in_period, exam_counts, exam_types, rooms, na_exams, period=None, guard=_no_guard):
+    """Aggregate room checks for the exams that may share one (day, slot).
+
+    exams_in_period is a list of (exam, bool_var) pairs. These are necessary conditions only:
+    the actual packing is left to allocate_rooms.
+    """
+    physical_rooms = [room for room in rooms if room != NA_ROOM]
+    computer_rooms = [room for room in physical_rooms if "Computer" in rooms[room][0]]
+    me_exams = [(exam, at) for exam, at in exams_in_period if exam not in na_exams]
+    pc_exams = [(exam, at) for exam, at in me_exams if exam_types[exam] == "PC"]
+    enforce_capacity = guard("Room capacity", period)
+    enforce_pc = guard("PC rooms", period)
+    for tag, idx in (("AEA", 0), ("SEQ", 1)):
+        capacity = sum(rooms[room][1] for room in physical_rooms if tag in rooms[room][0])
+        model.Add(sum(exam_counts[exam][idx] * at for exam, at in me_exams) <= capacity).OnlyEnforceIf(enforce_capacity)
+        pc_capacity = sum(rooms[room][1] for room in computer_rooms if tag in rooms[room][0])
+        model.Add(sum(exam_counts[exam][idx] * at for exam, at in pc_exams) <= pc_capacity).OnlyEnforceIf(enforce_pc)
+    # Every ME exam needs a room of its own
+    model.Add(sum(at for exam, at in me_exams) <= len(physical_rooms)).OnlyEnforceIf(enforce_capacity)
+    model.Add(sum(at for exam, at in pc_exams) <= len(computer_rooms)).OnlyEnforceIf(enforce_pc)
+
+
+def allocate_period_rooms(task):
+    """Solve the room allocation for the exams of one (day, slot). Runs in a worker process."""
+    exams = task["exams"]
+    rooms = task["rooms"]
+    model = cp_model.CpModel()
+    exam_room = {}
+    for exam in exams:
+        for room in rooms:
+            exam_room[(exam, room)] = model.NewBoolVar(f'{exam}_in_{room.replace(" ", "_")}')
+    room_surplus, non_pc_exam_penalty = add_room_constraints(
+        model, exam_room, exams, task["exam_counts"], task["exam_types"], rooms, task["na_exams"]
+    )
+    # Each physical room holds at most one exam in this period
+    for room in rooms:
+        if room == NA_ROOM:
+            continue
+        model.AddAtMostOne(exam_room[(exam, room)] for exam in exams)
+    model.Minimize(sum(room_surplus) + sum(non_pc_exam_penalty) * task["room_penalty"])
+    # Pinned exams keep their rooms
+    for exam, pinned_rooms in task["fixed_rooms"].items():
+        for room in rooms:
+            model.Add(exam_room[(exam, room)] == int(room in pinned_rooms))
+    for exam, hinted_rooms in task["hint_rooms"].items():
+        for room in rooms:
+            model.AddHint(exam_room[(exam, room)], int(room in hinted_rooms))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = task["time_limit"]
+    solver.parameters.num_workers = 1  # Parallelism comes from solving periods side by side
+    status = solver.Solve(model)
+    if status not in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+        return {"period": task["period"], "ok": False, "rooms": {}, "room_surplus": 0}
+    assigned = {exam: [room for room in rooms if solver.Value(exam_room[(exam, room)]) == 1] for exam in exams}
+    return {
+        "period": task["period"],
+        "ok": True,
+        "rooms": assigned,
+        "room_surplus": sum(solver.Value(v) for v in room_surplus),
+    }
+
+
+def allocate_rooms(period_exams, exam_counts, exam_types, rooms, na_exams, room_penalty, time_limit=10, max_workers=None, hint_rooms=None, fixed_rooms=None):
+    """Allocate rooms independently for every period on a thread pool.
+
+    CP-SAT releases the GIL while it solves, so the periods' solves run in parallel. Threads rather than
+    processes, as this runs inside the Streamlit server, which can't safely be forked and is slow to spawn.
+
+    period_exams maps (day, slot) -> [exams]. hint_rooms and fixed_rooms optionally map exam -> [rooms]
+    from a previous timetable, as a starting point or as pinned rooms. Returns
+    {(day, slot): result of allocate_period_rooms}.
+    """
+    hint_rooms = hint_rooms or {}
+    fixed_rooms = fixed_rooms or {}
+    tasks = []
+    for period, exams in period_exams.items():
+        if not exams:
+            continue
+        tasks.append({
+            "period": period,
+            "exams": exams,
+            "exam_counts": {exam: exam_counts[exam] for exam in exams},
+            "exam_types": {exam: exam_types[exam] for exam in exams},
+            "rooms": rooms,
+            "na_exams": [exam for exam in exams if exam in na_exams],
+            "room_penalty": room_penalty,
+            "time_limit": time_limit,
+            "hint_rooms": {exam: hint_rooms[exam] for exam in exams if exam in hint_rooms},
+            "fixed_rooms": {exam: fixed_rooms[exam] for exam in exams if exam in fixed_rooms},
+        })
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(tasks)))
+    if max_workers == 1:
+        return {task["period"]: allocate_period_rooms(task) for task in tasks}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return {result["period"]: result for result in pool.map(allocate_period_rooms, tasks)}
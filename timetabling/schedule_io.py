@@ -0,0 +1,149 @@
+# Writing timetables as the styled Excel sheet and reading them back
+import logging
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+HEADER = ['Date', 'Time', 'Exam', 'Total No of Students', 'Room', 'Type']
+SLOT_NAMES = ['Morning', 'Afternoon']
+FIXED_FILL = PatternFill('solid', fgColor='FFFF54')
+CORE_FILL = PatternFill('solid', fgColor='EA3323')
+# Alternating by day
+DAY_FILLS = (PatternFill('solid', fgColor='E0EAF6'), PatternFill('solid', fgColor='CBE9B8'))
+CENTER = Alignment(vertical='center')
+
+logger = logging.getLogger(__name__)
+
+
+def file_reading(filepath, days, slots, strict=True):
+    """Read a timetable in the write_timetable layout into {exam: (day, slot, [rooms])}.
+
+    A day or slot outside days/slots raises ValueError, unless strict is False (warm starts from another
+    term's timetable), where those exams are left out and counted in the log.
+    """
+    #Read the uploaded file into a dataframe
+    df = pd.read_excel(filepath)
+    exams_timetabled = {}
+    day_name = slot_name = None
+    dropped = 0
+    #Build a dictionary of exams with their day, slot and room from excel timetable
+    for _, row in df.iterrows():
+        exam_name = row['Exam']
+
+
+        day_name = day_name if pd.isna(row['Date']) else row['Date']
+        slot_name = slot_name if pd.isna(row['Time']) else (0 if row['Time'] == "Morning" else 1)
+        if pd.isna(exam_name) or exam_name == '':
+            continue  # Skip empty rows
+        room = row['Room'].split(', ') if pd.notna(row['Room']) and row['Room'] else []
+
+        try:
+            d = days.index(day_name)
+            s = slots.index(slot_name)
+        except ValueError:
+            if strict:
+                raise ValueError(f"Unrecognized day or slot in file: {day_name} / {slot_name}")
+            dropped += 1
+            continue
+
+        exams_timetabled[exam_name] = (d, s, room)
+
+    if dropped:
+        logger.info(f"Left out {dropped} exams on days or slots outside this calendar")
+    return exams_timetabled
+
+
+def timetable_blocks(exams_timetabled, days, exam_counts, exam_types, fixed_modules, core_modules):
+    """[(day, slot, rows)] for every day and slot in sheet order.
+
+    rows holds (exam, students, rooms, type, fill) per exam scheduled in the slot, in the order of
+    exams_timetabled, and ends with an empty row. fill is CORE_FILL or FIXED_FILL for core and fixed
+    exams, None otherwise.
+    """
+    fixed_prefixes = tuple(fixed_modules)
+    core_prefixes = tuple(core_modules)
+    scheduled = {}
+    for exam, (d, s, room, *_) in exams_timetabled.items():
+        counts = exam_counts[exam]
+        fill = CORE_FILL if exam.startswith(core_prefixes) else FIXED_FILL if exam.startswith(fixed_prefixes) else None
+        scheduled.setdefault((d, s), []).append((
+            exam, f'AEA {counts[0]}, Non-AEA {counts[1]}', ', '.join(room),
+            " (Computer)" if exam_types[exam] == "PC" else " (Standard)", fill,
+        ))
+    return [(d, s, scheduled.get((d, s), []) + [('', '', '', '', None)])
+            for d in range(len(days)) for s in range(len(SLOT_NAMES))]
+
+
+def timetable_table(exams_timetabled, days, exam_counts, exam_types, fixed_modules, core_modules):
+    """The timetable sheet as a DataFrame, with the merged Date and Time cells empty below their first row."""
+    records = []
+    for d, s, rows in timetable_blocks(exams_timetabled, days, exam_counts, exam_types, fixed_modules, core_modules):
+        for i, row in enumerate(rows):
+            records.append([days[d] if s == 0 and i == 0 else None, SLOT_NAMES[s] if i == 0 else None,
+                            *(value or None for value in row[:4])])
+    # The sheet's closing empty row is left out, as pd.read_excel leaves it out. When the last block has no
+    # exams that row still carries its Time label, so it stays
+    if records and all(value is None for value in records[-1]):
+        records.pop()
+    return pd.DataFrame(records, columns=HEADER)
+
+
+def write_timetable(exams_timetabled, days, exam_counts, exam_types, fixed_modules, core_modules):
+    """Write {exam: (day, slot, [rooms], ...)} as the styled timetable workbook and return it in a BytesIO.
+
+    Every day has a Morning and an Afternoon block: one row per exam followed by an empty row, or just the
+    empty row when nothing is scheduled. Date and Time cells are merged over their day and block, rows are
+    filled blue and green by day, fixed exams yellow and core exams red. Merges, fills and column widths
+    are worked out from exams_timetabled up front, so the sheet is streamed in write-only mode.
+    """
+    blocks = timetable_blocks(exams_timetabled, days, exam_counts, exam_types, fixed_modules, core_modules)
+    widths = [len(name) for name in HEADER]
+    for _, _, rows in blocks:
+        for row in rows:
+            for i, value in enumerate(row[:4], start=2):
+                widths[i] = max(widths[i], len(value))
+    widths[0] = max([widths[0]] + [len(str(day_name)) for day_name in days])
+    widths[1] = max([widths[1]] + [len(slot_name) for slot_name in SLOT_NAMES])
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    # Column widths are written with the sheet header, so they have to be set before the first row
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width + 2
+
+    def cell(value, fill, alignment=None):
+        c = WriteOnlyCell(ws, value)
+        c.fill = fill
+        if alignment is not None:
+            c.alignment = alignment
+        return c
+
+    ws.append(HEADER)
+    excel_row = 2
+    day_start = excel_row
+    for d, s, rows in blocks:
+        day_fill = DAY_FILLS[d % 2]
+        slot_start = excel_row
+        if s == 0:
+            day_start = excel_row
+        for exam, students, room, type_str, fill in rows:
+            # Merged Date and Time cells only show the value of their first row
+            ws.append([
+                cell(days[d] if excel_row == day_start else None, day_fill, CENTER),
+                cell(SLOT_NAMES[s] if excel_row == slot_start else None, day_fill, CENTER),
+                *(cell(value, fill or day_fill) for value in (exam, students, room, type_str)),
+            ])
+            excel_row += 1
+        if excel_row - slot_start > 1:
+            ws.merged_cells.add(f"B{slot_start}:B{excel_row - 1}")
+        if s == len(SLOT_NAMES) - 1:
+            ws.merged_cells.add(f"A{day_start}:A{excel_row - 1}")
+
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
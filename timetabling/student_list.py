@@ -0,0 +1,136 @@
+# One vectorised pass over the student list workbook into a sparse student x exam incidence matrix
+import numpy as np
+import pandas as pd
+
+# Column J onwards holds one column per exam, students start on the third row
+FIRST_EXAM_COLUMN = 9
+FIRST_STUDENT_ROW = 2
+AEA_COLUMN = 3
+TAKEN_MARKS = {"x", "a", "b"}
+VALID_MARKS = TAKEN_MARKS | {"nan"}
+EXTRA_TIME_25 = ("15min/hour", "25% extra time")
+EXTRA_TIME_50 = ("30min/hour", "50% extra time")
+
+
+class StudentList:
+    """The parsed student list.
+
+    Student i (row i of the student rows) takes exams[j] for j in indices[indptr[i]:indptr[i + 1]]
+    (CSR layout). aea, extra_time_25 and extra_time_50 are boolean vectors over the students and
+    errors holds the cell errors found while parsing. cids is a list, or an int64 array after compact().
+    """
+
+    def __init__(self, exams, cids, indptr, indices, aea, extra_time_25, extra_time_50, errors):
+        self.exams = exams
+        self.cids = cids
+        self.indptr = indptr
+        self.indices = indices
+        self.aea = aea
+        self.extra_time_25 = extra_time_25
+        self.extra_time_50 = extra_time_50
+        self.errors = errors
+
+    def __len__(self):
+        return len(self.cids)
+
+    def _cid_list(self):
+        return self.cids.tolist() if isinstance(self.cids, np.ndarray) else self.cids
+
+    def student_exams(self):
+        """{CID: [exam names]}; a CID listed twice keeps its last row."""
+        exams = self.exams
+        indices = self.indices.tolist()
+        indptr = self.indptr.tolist()
+        return {cid: [exams[j] for j in indices[indptr[i]:indptr[i + 1]]] for i, cid in enumerate(self._cid_list())}
+
+    def _cids(self, mask):
+        # A set, so category lookups such as cid in AEA are O(1)
+        return {cid for cid, flag in zip(self._cid_list(), mask.tolist()) if flag}
+
+    def aea_cids(self):
+        return self._cids(self.aea)
+
+    def extra_time_25_cids(self):
+        return self._cids(self.extra_time_25)
+
+    def extra_time_50_cids(self):
+        return self._cids(self.extra_time_50)
+
+    def exam_counts(self):
+        """{exam: [AEA students, non-AEA students]} for every exam taken by at least one student."""
+        cids = pd.Series(self._cid_list(), dtype=object)
+        kept = ~cids.duplicated(keep="last").to_numpy()
+        is_aea = cids.isin(self.aea_cids()).to_numpy()
+        entry_student = np.repeat(np.arange(len(self.cids)), np.diff(self.indptr))
+        entry_kept = kept[entry_student]
+        entry_aea = is_aea[entry_student]
+        aea_counts = np.bincount(self.indices[entry_kept & entry_aea], minlength=len(self.exams))
+        other_counts = np.bincount(self.indices[entry_kept & ~entry_aea], minlength=len(self.exams))
+        return {
+            exam: [int(aea_counts[j]), int(other_counts[j])]
+            for j, exam in enumerate(self.exams) if aea_counts[j] + other_counts[j] > 0
+        }
+
+    def compact(self):
+        """Copy for keeping in session state, e.g. in a TimetableResult.
+
+        Whole-number CIDs become an int64 array and indptr int32 when it fits; parse errors are dropped.
+        The exam names stay the one shared list the indices point into.
+        """
+        cids = self.cids
+        if isinstance(cids, list) and cids and all(isinstance(cid, (int, np.integer)) and not isinstance(cid, bool) for cid in cids):
+            cids = np.array(cids, dtype=np.int64)
+        indptr = self.indptr
+        if len(indptr) and indptr[-1] <= np.iinfo(np.int32).max:
+            indptr = indptr.astype(np.int32)
+        return StudentList(self.exams, cids, indptr, self.indices, self.aea, self.extra_time_25, self.extra_time_50, [])
+
+
+def parse_student_list(df):
+    """Parse the student list (read with header=None) in one vectorised pass.
+
+    Every distinct cell value is normalised once with str().strip().lower(), so the cost per cell is
+    a factorize lookup rather than Python string work.
+    """
+    exams = df.iloc[0, FIRST_EXAM_COLUMN:].dropna().tolist() if len(df) else []
+    rows = df.iloc[FIRST_STUDENT_ROW:, :]
+    cids = rows.iloc[:, 0].tolist() if rows.shape[1] else []
+    num_students = len(cids)
+
+    block = rows.iloc[:, FIRST_EXAM_COLUMN:FIRST_EXAM_COLUMN + len(exams)].to_numpy(dtype=object)
+    codes, uniques = pd.factorize(block.ravel(), use_na_sentinel=True)
+    marks = [str(value).strip().lower() for value in uniques]
+    # Index -1 (the last entry) is the NaN sentinel, which reads as 'nan'
+    taken_lookup = np.array([mark in TAKEN_MARKS for mark in marks] + [False])
+    valid_lookup = np.array([mark in VALID_MARKS for mark in marks] + [True])
+    taken = taken_lookup[codes].reshape(block.shape)
+    valid = valid_lookup[codes].reshape(block.shape)
+
+    student_idx, exam_idx = np.nonzero(taken)
+    indptr = np.zeros(num_students + 1, dtype=np.int64)
+    np.cumsum(np.bincount(student_idx, minlength=num_students), out=indptr[1:])
+    indices = exam_idx.astype(np.int32)
+
+    arrangements = rows.iloc[:, AEA_COLUMN] if rows.shape[1] > AEA_COLUMN else pd.Series([np.nan] * num_students)
+    arrangement_str = arrangements.astype(str)
+    aea = (arrangements.notna() & (arrangement_str.str.strip() != "#N/A")).to_numpy()
+    extra_time_25 = arrangement_str.str.startswith(EXTRA_TIME_25).to_numpy()
+    extra_time_50 = arrangement_str.str.startswith(EXTRA_TIME_50).to_numpy()
+
+    # Errors in row order: a missing CID, or else each invalid mark in the row
+    errors = []
+    row_labels = rows.index.tolist()
+    missing_cid = rows.iloc[:, 0].isna().to_numpy() if num_students else np.zeros(0, dtype=bool)
+    bad_rows, bad_cols = np.nonzero(~valid & ~missing_cid[:, None])
+    bad = iter(zip(bad_rows.tolist(), bad_cols.tolist()))
+    next_bad = next(bad, None)
+    for i in np.union1d(np.flatnonzero(missing_cid), bad_rows).tolist():
+        if missing_cid[i]:
+            errors.append(f"Missing CID in row {row_labels[i] + 3}")
+            continue
+        while next_bad is not None and next_bad[0] == i:
+            j = next_bad[1]
+            errors.append(f"Invalid exam indicator '{marks[codes[i * len(exams) + j]]}' for student {cids[i]} in exam {exams[j]}")
+            next_bad = next(bad, None)
+
+    return StudentList(exams, cids, indptr, indices, aea, extra_time_25, extra_time_50, errors)
@@ -0,0 +1,50 @@
+# Grouping of students into equivalence classes for model building and reporting
+
+
+def student_category(cid, AEA, extra_time_students_25, extra_time_students_50):
+    """Return the exam-arrangement category that decides which student constraints apply."""
+    if cid in extra_time_students_50:
+        return "50% extra time"
+    if cid in extra_time_students_25:
+        return "25% extra time"
+    if cid in AEA:
+        return "AEA"
+    return "Standard"
+
+
+def group_students(student_exams, AEA, extra_time_students_25, extra_time_students_50):
+    """Group students with the same exam selection and category.
+
+    Returns (student_classes, student_class) where student_classes is a list of
+    {"exams": [...], "category": str, "cids": [...]} and student_class maps CID -> class index.
+    Students in the same class are interchangeable for every constraint, so each class only
+    needs to be modelled (and checked) once.
+    """
+    # Sets so the category lookups stay O(1) on large cohorts
+    AEA = set(AEA)
+    extra_time_students_25 = set(extra_time_students_25)
+    extra_time_students_50 = set(extra_time_students_50)
+
+    student_classes = []
+    class_index = {}
+    student_class = {}
+    for cid, exs in student_exams.items():
+        category = student_category(cid, AEA, extra_time_students_25, extra_time_students_50)
+        key = (frozenset(exs), category)
+        if key not in class_index:
+            class_index[key] = len(student_classes)
+            student_classes.append({"exams": list(exs), "category": category, "cids": []})
+        student_classes[class_index[key]]["cids"].append(cid)
+        student_class[cid] = class_index[key]
+    return student_classes, student_class
+
+
+def describe_students(cids, limit=5):
+    """Short label for a group of students, e.g. 'Students 123, 456 and 3 more'."""
+    cids = [str(cid) for cid in cids]
+    if len(cids) == 1:
+        return f"Student {cids[0]}"
+    shown = ", ".join(cids[:limit])
+    if len(cids) > limit:
+        return f"Students {shown} and {len(cids) - limit} more"
+    return f"Students {shown}"